@@ -0,0 +1,68 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Measure DatabaseLoader throughput for a full season.
+
+Usage: python benchmarks/database.py DATABASE REPORT.HTM [REPORT.HTM ...]
+
+The given reports (one game's worth) are parsed once and loaded into the
+SQLite file DATABASE once per game of the 2018 regular season.
+"""
+
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Run from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(HERE))
+
+import nhlscrappo.constants as C
+from nhlscrappo import GameType, ReportType
+from nhlscrappo.database import DatabaseLoader
+from nhlscrappo.parsers import PARSERS
+
+def main(database, paths):
+    parsers = []
+    for path in paths:
+        cls = PARSERS[ReportType(os.path.basename(path)[:2])]
+        parser = cls(2018, 1, GameType.Regular)
+        parser.make_document(local = path)
+        parser.load_all()
+        parsers.append(parser)
+
+    if os.path.exists(database):
+        os.remove(database)
+    loader = DatabaseLoader(database)
+    loader.create_tables()
+    games = C.GAME_CT_DICT[2018]
+    start = time.perf_counter()
+    with loader:
+        for game_num in range(1, games + 1):
+            for parser in parsers:
+                parser.game_num = game_num
+                loader.add(parser)
+    elapsed = time.perf_counter() - start
+    print("%i games, %i rows in %.2f s: %.0f rows/s" % (games, loader.rows, \
+        elapsed, loader.rows / elapsed))
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,90 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Check the cold import time of the package against a budget.
+
+Usage: python benchmarks/import_time.py [--budget MS] [--repeat N]
+
+Every module below is imported in a fresh interpreter, once to cache its
+bytecode and then repeat times. The best cumulative time reported by
+python -X importtime is compared with the budget, and the heavy parsing and
+networking libraries must not have been imported along the way. The exit
+status is 1 when a module is over budget or pulls one of them in.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ("nhlscrappo.constants", "nhlscrappo.records", \
+    "nhlscrappo.parsers", "nhlscrappo.bulk", "nhlscrappo.sync", \
+    "nhlscrappo.pool")
+
+HEAVY = ("bs4", "lxml", "urllib.request", "http.client", "ssl", \
+    "concurrent.futures", "multiprocessing")
+"""Modules that only a parse or fetch should import"""
+
+PROBE = "import sys, %s; print(','.join(m for m in %r if m in sys.modules))"
+
+def import_time(module, env):
+    """Return the cumulative import time of module (ms) and heavy imports"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", \
+        PROBE % (module, HEAVY)], env = env, check = True, \
+        stdout = subprocess.PIPE, stderr = subprocess.PIPE, \
+        universal_newlines = True)
+    total = None
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            total = int(fields[1]) / 1000.0
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, loaded
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type = float, default = 50.0)
+    parser.add_argument("--repeat", type = int, default = 5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.dirname(HERE)] + \
+        [p for p in [env.get("PYTHONPATH")] if p])
+    failures = []
+    for module in MODULES:
+        import_time(module, env)
+        best = min(import_time(module, env)[0] for _ in range(args.repeat))
+        loaded = import_time(module, env)[1]
+        print("%-24s %8.1f ms %s" % (module, best, " ".join(loaded)))
+        if best > args.budget:
+            failures.append("%s takes %.1f ms" % (module, best))
+        if loaded:
+            failures.append("%s imports %s" % (module, ", ".join(loaded)))
+    for failure in failures:
+        print("OVER BUDGET: " + failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Compare load_all() against calling each load_* method in sequence.
+
+Usage: python benchmarks/load_all.py [REPORT.HTM ...]
+
+Reports are recognised by the two letter prefix of their file name, as in
+the NHL.com naming scheme (RO020001.HTM, PL020001.HTM, ...). Without
+arguments every report of the benchmark corpus is compared.
+"""
+
+import glob
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Run from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(HERE))
+
+from nhlscrappo import GameType, ReportType
+from nhlscrappo.parsers import PARSERS
+
+INDIVIDUAL = {
+    ReportType.Roster: ["load_teams", "load_players", "load_scratches", \
+        "load_coaches", "load_officials"],
+    ReportType.Shots: ["load_shots"],
+    ReportType.HomeTOI: ["load_players"],
+    ReportType.AwayTOI: ["load_players"],
+    ReportType.Events: ["load_events"],
+    ReportType.Plays: ["load_plays"]
+}
+
+def bench(path, number = 5):
+    report_type = ReportType(os.path.basename(path)[:2])
+    cls = PARSERS[report_type]
+    soup = cls(2018, 1, GameType.Regular).make_soup(local = path)
+
+    def run(methods):
+        parser = cls(2018, 1, GameType.Regular)
+        parser.soup = soup
+        for method in methods:
+            getattr(parser, method)()
+
+    sequence = min(timeit.repeat(lambda: run(INDIVIDUAL[report_type]), \
+        number = number, repeat = 3)) / number
+    single = min(timeit.repeat(lambda: run(["load_all"]), \
+        number = number, repeat = 3)) / number
+    return sequence, single
+
+def main(paths):
+    print("%-24s %13s %13s %8s" % ("report", "load_* (ms)", "load_all (ms)", \
+        "speedup"))
+    for path in paths:
+        sequence, single = bench(path)
+        print("%-24s %13.2f %13.2f %7.2fx" % (os.path.basename(path), \
+            sequence * 1000, single * 1000, sequence / single))
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or sorted(glob.glob(os.path.join(HERE, "corpus", \
+        "*.HTM"))))
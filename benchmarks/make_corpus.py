@@ -0,0 +1,434 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Generate the benchmark corpus: synthetic reports laid out like the RTSS HTM
+files on NHL.com, covering regular season, playoff overtime and the French
+officials format. Output is deterministic.
+
+Usage: python benchmarks/make_corpus.py [DIRECTORY]
+"""
+
+import os
+import random
+import sys
+
+AWAY = "BOSTON BRUINS"
+HOME = "TORONTO MAPLE LEAFS"
+NAMES = {
+    AWAY: ["JOHN DOE", "PATRICE BERGERON", "BRAD MARCHAND", \
+        "DAVID PASTRNAK", "CHARLIE MCAVOY", "TOREY KRUG", "JAKE DEBRUSK", \
+        "SEAN KURALY", "DAVID KREJCI", "JOAKIM NORDSTROM", "DANTON HEINEN", \
+        "NOEL ACCIARI", "CHRIS WAGNER", "MATT GRZELCYK", "KEVAN MILLER", \
+        "TUUKKA RASK", "ZDENO CHARA", "BRANDON CARLO", "ANDERS BJORK", \
+        "TIM SCHALLER", "PETER CEHLARIK", "KARSON KUHLMAN", "JOHN MOORE", \
+        "ZACH SENYSHYN"],
+    HOME: ["AUSTON MATTHEWS", "ZACH HYMAN", "MITCHELL MARNER", \
+        "MORGAN RIELLY", "JAKE GARDINER", "WILLIAM NYLANDER", \
+        "JOHN TAVARES", "ANDREAS JOHNSSON", "NAZEM KADRI", "RON HAINSEY", \
+        "KASPERI KAPANEN", "PATRICK MARLEAU", "FREDERIK GAUTHIER", \
+        "NIKITA ZAITSEV", "TRAVIS DERMOTT", "FREDERIK ANDERSEN", \
+        "IGOR OZHIGANOV", "JAKE MUZZIN", "TYLER ENNIS", "CONNOR BROWN", \
+        "PAR LINDHOLM", "JOSH LEIVO", "CALLE ROSEN", "MIRO AALTONEN"]
+}
+"""Name pool of each team, so no player has a namesake on the other side"""
+POSITIONS = ["C", "L", "R", "D", "D", "R", "C", "L", "C", "D", "R", "L", \
+    "C", "D", "D", "G", "D", "D", "L", "R", "C", "R", "D", "C"]
+"""Position of each name of a pool"""
+
+def team_roster(seed, team):
+    """Shuffled (number, position, name) of the 24 players of team"""
+    rand = random.Random(seed)
+    order = list(range(24))
+    rand.shuffle(order)
+    numbers = rand.sample(range(2, 99), 24)
+    return [(numbers[i], POSITIONS[j], NAMES[team][j]) \
+        for i, j in enumerate(order)]
+
+def page(body):
+    return "<html>\n<head>\n<meta http-equiv=\"Content-Type\" " \
+        "content=\"text/html; charset=utf-8\">\n<title>NHL Report</title>\n" \
+        "</head>\n<body>\n<table width=\"100%\" border=\"0\" " \
+        "cellpadding=\"0\" cellspacing=\"0\">\n<tr><td width=\"100%\" " \
+        "align=\"center\">\n" + body + "\n</td></tr>\n</table>\n</body>\n" \
+        "</html>\n"
+
+def header():
+    return "<table width=\"100%\" border=\"0\"><tr><td width=\"100%\" " \
+        "class=\"header\">Game Report</td></tr></table>\n"
+
+def clock(seconds):
+    return "%d:%02d" % (seconds // 60, seconds % 60)
+
+def cells(values, cls):
+    return "".join("<td align=\"center\" class=\"%s\">%s</td>" % (cls, value) \
+        for value in values)
+
+def roster_report(french = False, seed = 1):
+    away, home = team_roster(seed, AWAY), team_roster(seed + 1, HOME)
+
+    def players(roster):
+        out = ["<table border=\"0\" cellpadding=\"0\" cellspacing=\"0\">", \
+            "<tr><td align=\"center\" class=\"heading + bborder\">#</td>" \
+            "<td align=\"center\" class=\"heading + bborder\">Pos</td>" \
+            "<td class=\"heading + bborder\">Name</td></tr>"]
+        for i, (number, position, name) in enumerate(roster):
+            adorn = " (C)" if i == 0 else (" (A)" if i in (1, 2) else "")
+            cls = "bold" if i < 6 else ""
+            out.append("<tr><td align=\"center\" class=\"%s\">%d</td>" \
+                "<td align=\"center\" class=\"%s\">%s</td>" \
+                "<td class=\"%s\">%s%s</td></tr>" % (cls, number, cls, \
+                position, cls, name, adorn))
+        out.append("</table>")
+        return "\n".join(out)
+
+    heading = "<td width=\"50%%\" align=\"center\" " \
+        "class=\"teamHeading + border\">%s</td>\n"
+    column = "<td width=\"50%%\" valign=\"top\">%s</td>\n"
+    coach = "<td width=\"50%%\" valign=\"top\"><table><tr><td>%s</td></tr>" \
+        "</table></td>\n"
+    body = header() + "<table width=\"100%\" border=\"0\"><tr>\n"
+    body += heading % AWAY + heading % HOME
+    body += "</tr><tr>\n" + column % players(away[:20])
+    body += column % players(home[:20]) + "</tr><tr>\n"
+    body += column % players(away[20:])
+    body += column % players(home[20:]) + "</tr><tr>\n"
+    body += coach % "BRUCE CASSIDY" + coach % "MIKE BABCOCK"
+    body += "</tr></table>\n<table width=\"100%\" border=\"0\"><tr>" \
+        "<td width=\"100%\">\n<table>\n"
+    if not french:
+        body += "<tr valign=\"top\" id=\"\">\n<td align=\"right\">Referee:" \
+            "</td>\n<td align=\"left\"><table><tr><td>#27 Wes McCauley</td>" \
+            "</tr><tr><td>#9 Dan O'Rourke</td></tr></table></td>\n" \
+            "<td align=\"left\">&nbsp;</td>\n<td align=\"left\">&nbsp;</td>" \
+            "\n<td align=\"right\">Linesman:</td>\n<td align=\"left\">" \
+            "<table><tr><td>#75 Derek Amell</td></tr><tr><td>#59 Steve " \
+            "Barton</td></tr></table></td>\n</tr>\n"
+    else:
+        body += "<tr valign=\"top\" id=\"\">\n<td align=\"left\">#27 Wes " \
+            "McCauley</td>\n<td align=\"left\">#9 Dan O'Rourke</td>\n" \
+            "<td align=\"center\">Arbitres</td><td align=\"center\">&nbsp;" \
+            "</td><td align=\"center\">&nbsp;</td><td align=\"center\">" \
+            "&nbsp;</td><td align=\"center\">Juges de lignes</td>" \
+            "<td align=\"center\">#75 Derek Amell</td>\n" \
+            "<td align=\"center\">#59 Steve Barton</td>\n</tr>\n"
+    body += "</table>\n</td></tr></table>\n"
+    return page(body)
+
+def shot_report(periods, seed = 1):
+    rand = random.Random(seed)
+
+    def team(roster, name):
+        out = "<table><tr><td>\n<table><tr><td class=\"teamHeading\">%s" \
+            "</td></tr></table>\n" % name
+        out += "<table><tr><td class=\"heading\">Player</td>" \
+            "<td class=\"heading\">Per</td><td class=\"heading\">EV</td>" \
+            "<td class=\"heading\">PP</td><td class=\"heading\">SH</td>" \
+            "<td class=\"heading\">TOT</td></tr></table>\n"
+        out += "<table border=\"0\">\n"
+        for i, (number, position, player) in enumerate(roster):
+            color = "oddColor" if i % 2 == 0 else "evenColor"
+            first, last = player.split(" ")
+            out += "<tr>\n<td align=\"center\" class=\"\">%d</td>" \
+                "<td align=\"center\" class=\"\">%s</td>" \
+                "<td align=\"center\" class=\"\">%s</td>\n<td><table>\n" % \
+                (number, first, last)
+            total = [0, 0, 0]
+            for period in periods:
+                even, power = rand.randint(0, 3), rand.randint(0, 1)
+                short = rand.randint(0, 1) if rand.random() < .2 else 0
+                total = [total[0] + even, total[1] + power, total[2] + short]
+                values = [period] + [str(value) if value else "&nbsp;" \
+                    for value in (even, power, short, even + power + short)]
+                out += "<tr class=\"%s\">%s</tr>\n" % (color, \
+                    cells(values, "bborder"))
+            values = ["TOT"] + [str(value) for value in total + [sum(total)]]
+            out += "<tr class=\"%s\">%s</tr>\n" % (color, \
+                cells(values, "bborder"))
+            out += "</table></td>\n</tr>\n"
+        out += "</table>\n</td></tr></table>\n"
+        return out
+
+    away, home = team_roster(seed, AWAY), team_roster(seed + 1, HOME)
+    body = header() + "<table width=\"100%\"><tr><td width=\"50%\">Visitor" \
+        "</td><td width=\"50%\">Home</td></tr>\n<tr><td width=\"50%\">" \
+        "Summary</td><td width=\"50%\">Summary</td></tr>\n"
+    body += "<tr><td width=\"50%%\" valign=\"top\">%s</td>\n" % \
+        team(away[:18], AWAY)
+    body += "<td width=\"50%%\" valign=\"top\">%s</td></tr></table>\n" % \
+        team(home[:18], HOME)
+    return page(body)
+
+# The play-by-play and both time-on-ice reports of a game are drawn from one
+# model, so the players on the ice for every play match the shift reports.
+def line_changes(roster, periods, lengths, rand):
+    """Line changes of one team: per period a list of (start, end, players)"""
+    goalie = roster[15]
+    skaters = [player for player in roster if player is not goalie]
+    changes, k = {}, 0
+    for period in periods:
+        start, segments = 0, []
+        while start < lengths[period]:
+            end = min(start + rand.randint(25, 70), lengths[period])
+            line = skaters[5 * k:5 * k + 5]
+            if rand.random() < .3:
+                line[rand.randrange(5)] = skaters[15 + rand.randrange(2)]
+            segments.append((start, end, line + [goalie]))
+            k, start = (k + 1) % 3, end
+        changes[period] = segments
+    return changes
+
+def game(periods, seed, plays = 80):
+    """Rosters, period lengths, events and line changes of one game"""
+    rand = random.Random(seed)
+    away = team_roster(seed, AWAY)[:18]
+    home = team_roster(seed + 1, HOME)[:18]
+    lengths, events = {}, {}
+    for period in periods:
+        length = 300 if period == "OT" else 1200
+        played = []
+        for elapsed in sorted(rand.sample(range(1, length), plays)):
+            code, template = rand.choice(EVENTS)
+            strength = "&nbsp;" if code == "STOP" else \
+                rand.choice(["EV"] * 8 + ["PP", "SH"])
+            played.append((elapsed, code, template, strength))
+            if code == "GOAL" and period == "OT":
+                length = elapsed
+                break
+        lengths[period], events[period] = length, played
+    return away, home, lengths, events, \
+        line_changes(away, periods, lengths, rand), \
+        line_changes(home, periods, lengths, rand)
+
+def on_ice_at(segments, elapsed, starts):
+    """Players on the ice at elapsed; faceoffs see the line starting then"""
+    for start, end, players in segments:
+        if (start <= elapsed < end) if starts else (start < elapsed <= end):
+            return players
+    return []
+
+def shifts(player, periods, changes):
+    """Consecutive line changes a player stays on for, merged into shifts"""
+    out = []
+    for period in periods:
+        for start, end, players in changes[period]:
+            if player not in players:
+                continue
+            if out and out[-1][0] == period and out[-1][2] == start:
+                out[-1][2] = end
+            else:
+                out.append([period, start, end])
+    return out
+
+def toi_report(periods, seed = 1, team = HOME):
+    away, home, lengths, events, away_changes, home_changes = \
+        game(periods, seed)
+    roster, changes = (home, home_changes) if team == HOME else \
+        (away, away_changes)
+    rand = random.Random(seed + (1 if team == HOME else 0))
+    cls = "lborder + bborder"
+    body = header() + "<table width=\"100%\" border=\"0\">\n"
+    body += "<tr><td class=\"teamHeading + border\">%s</td></tr>\n" % team
+    for player in roster:
+        number, position, name = player
+        first, last = name.split(" ")
+        body += "<tr><td class=\"playerHeading + border\" colspan=\"8\">" \
+            "%d %s, %s</td></tr>\n" % (number, last, first)
+        body += "<tr><td><table>\n<tr><td class=\"heading + bborder\">" \
+            "Shift #</td><td class=\"heading + bborder\">Per</td>" \
+            "<td class=\"heading + bborder\">Start</td>" \
+            "<td class=\"heading + bborder\">End</td>" \
+            "<td class=\"heading + bborder\">Duration</td>" \
+            "<td class=\"heading + bborder\">Event</td></tr>\n"
+        total = 0
+        played = shifts(player, periods, changes)
+        for shift, (period, start, end) in enumerate(played, 1):
+            length = lengths[period]
+            total += end - start
+            event = rand.choice(["&nbsp;"] * 8 + ["G", "P"])
+            color = "oddColor" if shift % 2 else "evenColor"
+            values = [str(shift), period, "%s / %s" % (clock(start), \
+                clock(length - start)), "%s / %s" % (clock(end), \
+                clock(length - end)), clock(end - start)]
+            body += "<tr class=\"%s\">%s<td align=\"center\" " \
+                "class=\"%s + rborder\">%s</td></tr>\n" % (color, \
+                cells(values, cls), cls, event)
+        body += "</table></td></tr>\n"
+        values = [str(len(played)), clock(total // max(len(played), 1)), \
+            clock(total), clock(total), "0:00", "0:00"]
+        body += "<tr><td><table><tr class=\"oddColor\">%s</tr></table>" \
+            "</td></tr>\n" % cells(values, cls)
+    body += "</table>\n"
+    return page(body)
+
+def event_report(seed = 1):
+    rand = random.Random(seed)
+    cls = "lborder + bborder"
+
+    def rows(roster):
+        out = ""
+        for i, (number, position, name) in enumerate(roster[:20]):
+            first, last = name.split(" ")
+            goals, assists = rand.randint(0, 1), rand.randint(0, 2)
+            scoring = [goals, assists, goals + assists, rand.randint(-2, 2), \
+                0, 0]
+            toi = [clock(rand.randint(600, 1500)), \
+                str(rand.randint(15, 30)), "0:45", "0:00", "0:00", \
+                clock(rand.randint(600, 1500))]
+            rest = [rand.randint(0, 5), "", rand.randint(0, 2), \
+                rand.randint(0, 4), rand.randint(0, 2), rand.randint(0, 2), \
+                rand.randint(0, 3), \
+                rand.randint(0, 10) if position == "C" else "", \
+                rand.randint(0, 10) if position == "C" else "", ""]
+            scoring = [str(value) if value != 0 else "&nbsp;" \
+                for value in scoring]
+            rest = [str(value) if value != "" else "&nbsp;" for value in rest]
+            color = "evenColor" if i % 2 == 0 else "oddColor"
+            out += "<tr class=\"%s\">" % color
+            out += cells([number, position], cls)
+            out += "<td class=\"%s\">%s, %s</td>" % (cls, last, first)
+            out += cells(scoring + toi + rest, cls)
+            out += "</tr>\n"
+        return out
+
+    gap = "<tr class=\"bold\"><td colspan=\"25\">TEAM TOTALS</td></tr>\n" \
+        "<tr><td colspan=\"25\">&nbsp;</td></tr>\n<tr><td colspan=\"25\" " \
+        "class=\"visitorsectionheading\">%s</td></tr>\n" \
+        "<tr class=\"heading\"><td colspan=\"25\">&nbsp;</td></tr>\n" \
+        "<tr class=\"heading\"><td colspan=\"25\">&nbsp;</td></tr>\n" % HOME
+    body = header() + "<table width=\"100%\" border=\"0\">\n"
+    body += "<tr><td colspan=\"25\" class=\"visitorsectionheading\">%s" \
+        "</td></tr>\n" % AWAY
+    body += "<tr class=\"heading\"><td colspan=\"25\">&nbsp;</td></tr>\n"
+    body += rows(team_roster(seed, AWAY)) + gap + \
+        rows(team_roster(seed + 1, HOME))
+    body += "<tr class=\"bold\"><td colspan=\"25\">TEAM TOTALS</td></tr>\n" \
+        "</table>\n"
+    return page(body)
+
+EVENTS = [("FAC", "{a} won Off. Zone - {an} #{n1} {p1} vs {hn} #{n2} {p2}"), \
+    ("SHOT", "{a} ONGOAL - #{n1} {p1}, Wrist, Off. Zone, 34 ft."), \
+    ("HIT", "{h} #{n2} {p2} HIT {an} #{n1} {p1}, Def. Zone"), \
+    ("MISS", "{a} #{n1} {p1}, Snap, Wide of Net, Off. Zone, 40 ft."), \
+    ("BLOCK", "{h} #{n2} {p2} BLOCKED BY {an} #{n1} {p1}, Slap, Def. Zone"), \
+    ("GIVE", "{h} GIVEAWAY - #{n2} {p2}, Neu. Zone"), \
+    ("TAKE", "{a} TAKEAWAY - #{n1} {p1}, Off. Zone"), \
+    ("STOP", "ICING"), \
+    ("PENL", "{h} #{n2} {p2} Tripping(2 min), Def. Zone Drawn By: {an} " \
+        "#{n1} {p1}"), \
+    ("GOAL", "{a} #{n1} {p1}(1), Wrist, Off. Zone, 12 ft.<br>Assists: " \
+        "#{n3} {p3}(1)")]
+"""Event codes and description templates of the play-by-play"""
+
+def on_ice(players):
+    if not players:
+        return "&nbsp;"
+    out = []
+    for number, position, name in players:
+        out.append("<td align=\"center\">\n<table cellpadding=\"0\" " \
+            "cellspacing=\"0\" border=\"0\">\n<tr><td align=\"center\">" \
+            "<font style=\"cursor:hand;\" title=\"%s - %s\">%d</font></td>" \
+            "</tr>\n<tr><td align=\"center\">%s</td></tr>\n</table>\n" \
+            "</td>" % (position, name, number, position))
+    return "\n<table cellpadding=\"0\" cellspacing=\"0\" border=\"0\">\n" \
+        "<tr>\n" + "\n<td align=\"center\" width=\"1%\">&nbsp;</td>\n" \
+        .join(out) + "\n</tr>\n</table>\n"
+
+def play_report(periods, seed = 1):
+    away, home, lengths, events, away_changes, home_changes = \
+        game(periods, seed)
+    body = header() + "<table border=\"0\" cellpadding=\"0\" " \
+        "cellspacing=\"0\" width=\"100%\">\n<tr class=\"heading\">" \
+        "<td class=\"heading + bborder\">#</td>" \
+        "<td class=\"heading + bborder\">Per</td>" \
+        "<td class=\"heading + bborder\">Str</td>" \
+        "<td class=\"heading + bborder\">Time:<br>Elapsed Game</td>" \
+        "<td class=\"heading + bborder\">Event</td>" \
+        "<td class=\"heading + bborder\">Description</td>" \
+        "<td class=\"heading + bborder\">BOS On Ice</td>" \
+        "<td class=\"heading + bborder\">TOR On Ice</td></tr>\n"
+    number = 0
+
+    def row(period, strength, elapsed, length, code, description, \
+        away_ice, home_ice):
+        nonlocal number
+        number += 1
+        cls = "lborder + bborder"
+        return "<tr id=\"PL-%d\" class=\"evenColor\">\n" \
+            "<td align=\"center\" class=\"%s\">%d</td>\n" \
+            "<td class=\"%s\" align=\"center\">%s</td>\n" \
+            "<td class=\"%s\" align=\"center\">%s</td>\n" \
+            "<td class=\"%s\" align=\"center\">%s<br>%s</td>\n" \
+            "<td class=\"%s\" align=\"center\">%s</td>\n" \
+            "<td class=\"%s\">%s</td>\n" \
+            "<td class=\"%s\">%s</td>\n" \
+            "<td class=\"%s + rborder\">%s</td>\n</tr>\n" % (number, cls, \
+            number, cls, period, cls, strength, cls, clock(elapsed), \
+            clock(length - elapsed), cls, code, cls, description, cls, \
+            on_ice(away_ice), cls, on_ice(home_ice))
+
+    def last(player):
+        return player[2].split(" ")[1]
+
+    for period in periods:
+        length = lengths[period]
+        shown = "4" if period == "OT" else period
+        body += row(shown, "&nbsp;", 0, length, "PSTR", \
+            "Period Start- Local time: 7:08 EDT", [], [])
+        for elapsed, code, template, strength in events[period]:
+            away_ice = on_ice_at(away_changes[period], elapsed, code == "FAC")
+            home_ice = on_ice_at(home_changes[period], elapsed, code == "FAC")
+            description = template.format(a = "BOS", h = "TOR", an = "BOS", \
+                hn = "TOR", n1 = away_ice[0][0], p1 = last(away_ice[0]), \
+                n2 = home_ice[0][0], p2 = last(home_ice[0]), \
+                n3 = away_ice[1][0], p3 = last(away_ice[1]))
+            body += row(shown, strength, elapsed, length, code, description, \
+                away_ice, home_ice)
+        body += row(shown, "&nbsp;", length, length, "PEND", \
+            "Period End- Local time: 7:48 EDT", [], [])
+    body += row(periods[-1] if periods[-1] != "OT" else "4", "&nbsp;", 0, \
+        0, "GEND", "Game End- Local time: 9:40 EDT", [], [])
+    body += "</table>\n"
+    return page(body)
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+    os.makedirs(out, exist_ok = True)
+    regular, overtime = ["1", "2", "3"], ["1", "2", "3", "OT"]
+    files = {
+        "RO020001.HTM": roster_report(seed = 1),
+        "RO030111.HTM": roster_report(seed = 3),
+        "RO020002_fr.HTM": roster_report(french = True, seed = 5),
+        "SS020001.HTM": shot_report(regular, 1),
+        "SS030111.HTM": shot_report(overtime, 3),
+        "TH020001.HTM": toi_report(regular, 1, HOME),
+        "TV020001.HTM": toi_report(regular, 1, AWAY),
+        "TH030111.HTM": toi_report(overtime, 3, HOME),
+        "TV030111.HTM": toi_report(overtime, 3, AWAY),
+        "ES020001.HTM": event_report(1),
+        "ES030111.HTM": event_report(3),
+        "PL020001.HTM": play_report(regular, 1),
+        "PL030111.HTM": play_report(overtime, 3)
+    }
+    for name, html in files.items():
+        with open(os.path.join(out, name), "w", encoding = "utf-8") as handle:
+            handle.write(html)
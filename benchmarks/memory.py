@@ -0,0 +1,86 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Measure peak RSS of holding a season of parsed reports.
+
+Usage: python benchmarks/memory.py [--games N] REPORT.HTM [REPORT.HTM ...]
+
+The given reports (one game's worth) are parsed and extracted once per game
+of the 2018 regular season and every parser is kept, as a bulk run collecting
+its results would. Each mode runs in a fresh process:
+
+    keep      parsers keep their documents (the default behaviour)
+    release   parsers drop their documents with release()
+    results   only the ReportResult of every parser is kept
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Run from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(HERE))
+
+import nhlscrappo.constants as C
+from nhlscrappo import GameType, ReportType
+from nhlscrappo.parsers import PARSERS
+
+MODES = ("keep", "release", "results")
+
+def run(mode, games, paths):
+    kept = []
+    for game_num in range(1, games + 1):
+        for path in paths:
+            cls = PARSERS[ReportType(os.path.basename(path)[:2])]
+            parser = cls(2018, game_num, GameType.Regular)
+            parser.make_document(local = path)
+            parser.load_all()
+            if mode == "release":
+                parser.release()
+            elif mode == "results":
+                result = parser.result()
+                parser.release()
+                parser = result
+            kept.append(parser)
+    # ru_maxrss is in kilobytes on Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type = int, default = C.GAME_CT_DICT[2018])
+    parser.add_argument("--mode", choices = MODES)
+    parser.add_argument("paths", nargs = "+")
+    args = parser.parse_args()
+    if args.mode:
+        return run(args.mode, args.games, args.paths)
+    for mode in MODES:
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, \
+            "--games", str(args.games)] + args.paths, check = True, \
+            stdout = subprocess.PIPE, universal_newlines = True).stdout
+        print("%-8s %i games: peak RSS %.1f MiB" % (mode, args.games, \
+            int(out) / 1024.0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Benchmark every parser over the fixture corpus.
+
+Usage: python benchmarks/run.py [--save] [--tolerance 0.5] [--repeat 5]
+                                [--gate-time]
+
+Each report is parsed with every backend its parser supports, in a fresh
+process. For the read, tree and extract phases the harness records the best
+CPU time over the repeats, the number of Python allocations and the peak
+traced memory, plus the peak RSS of the whole case. Results are compared
+with baseline.json; allocations or peak memory more than tolerance above
+the baseline are reported as regressions and make the run exit with status
+1. They don't depend on the machine, unlike CPU times, which are shown in
+units of a fixed calibration loop timed in the same process so that runs on
+different machines stay comparable. Times only gate the run with
+--gate-time, and phases faster than MIN_TIME never do. --save writes the
+results as the new baseline.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, "corpus")
+BASELINE = os.path.join(HERE, "baseline.json")
+PHASES = ("read", "tree", "extract")
+MIN_TIME = 0.005
+
+def measure(func, repeat):
+    """Best CPU time of func() over repeat runs, and its allocations"""
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = func()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in \
+        after.compare_to(before, "filename") if stat.count_diff > 0)
+    return result, {"time": best, "allocations": blocks, "peak": peak}
+
+def calibrate(repeat):
+    """Best CPU time of a fixed pure-Python workload"""
+    def work():
+        table = {}
+        for i in range(100000):
+            table[str(i % 997)] = table.get(str(i % 997), 0) + i
+        return table
+    return measure(work, repeat)[1]["time"]
+
+def run_case(name, backend, repeat):
+    """Benchmark one report with one backend in this process"""
+    from nhlscrappo import GameType, ReportType
+    from nhlscrappo.parsers import PARSERS
+
+    path = os.path.join(CORPUS, name)
+    game_type = GameType(int(name[3]))
+    cls = PARSERS[ReportType(name[:2])]
+
+    def read():
+        with open(path, "rb") as handle:
+            return handle.read()
+
+    def tree():
+        parser = cls(2018, 1, game_type, backend = backend)
+        parser.parse(raw)
+        return parser
+
+    def extract():
+        parser = cls(2018, 1, game_type, backend = backend)
+        parser.soup, parser.tree = document.soup, document.tree
+        parser.load_all()
+        return parser
+
+    stats = {"calibration": calibrate(repeat)}
+    raw, stats["read"] = measure(read, repeat)
+    document, stats["tree"] = measure(tree, repeat)
+    parser, stats["extract"] = measure(extract, repeat)
+    stats["rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return stats
+
+def cases():
+    from nhlscrappo import ReportType
+    from nhlscrappo.parsers import PARSERS
+
+    for name in sorted(os.listdir(CORPUS)):
+        if not name.endswith(".HTM"):
+            continue
+        for backend in PARSERS[ReportType(name[:2])].backends:
+            yield name, backend
+
+def run_all(repeat):
+    results = {}
+    for name, backend in cases():
+        out = subprocess.run([sys.executable, __file__, "--case", name, \
+            backend, "--repeat", str(repeat)], check = True, \
+            stdout = subprocess.PIPE, universal_newlines = True)
+        results[name + ":" + backend] = json.loads(out.stdout)
+    return results
+
+def compare(results, baseline, tolerance, gate_time = False):
+    regressions = []
+    print("%-28s %-8s %10s %10s %10s %10s" % ("case", "phase", "time (ms)", \
+        "allocs", "peak (KiB)", "vs base"))
+    for case, stats in sorted(results.items()):
+        base = baseline.get(case, {})
+        # Times relative to the calibration loop of the same process
+        scale = stats["calibration"] / base["calibration"] \
+            if base.get("calibration") else 1.0
+        for phase in PHASES:
+            s = stats[phase]
+            b = base.get(phase)
+            change = ""
+            if b:
+                ratio = s["time"] / (b["time"] * scale) if b["time"] else 1.0
+                change = "%+.0f%%" % ((ratio - 1) * 100)
+                if gate_time and ratio > 1 + tolerance and \
+                    b["time"] >= MIN_TIME:
+                    regressions.append("%s %s time %+.0f%%" % (case, phase, \
+                        (ratio - 1) * 100))
+                if b["allocations"] and s["allocations"] > \
+                    b["allocations"] * (1 + tolerance):
+                    regressions.append("%s %s allocations %i -> %i" % \
+                        (case, phase, b["allocations"], s["allocations"]))
+                if b["peak"] and s["peak"] > b["peak"] * (1 + tolerance):
+                    regressions.append("%s %s peak memory %i -> %i" % (case, \
+                        phase, b["peak"], s["peak"]))
+            print("%-28s %-8s %10.2f %10i %10i %10s" % (case, phase, \
+                s["time"] * 1000, s["allocations"], s["peak"] // 1024, change))
+        print("%-28s %-8s %43s" % (case, "rss", "%i KiB" % \
+            (stats["rss"] // 1024)))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = "nhlscrappo benchmarks")
+    parser.add_argument("--case", nargs = 2, metavar = ("REPORT", "BACKEND"))
+    parser.add_argument("--repeat", type = int, default = 5)
+    parser.add_argument("--tolerance", type = float, default = 0.5)
+    parser.add_argument("--save", action = "store_true")
+    parser.add_argument("--gate-time", action = "store_true", \
+        help = "also fail on calibrated CPU time regressions")
+    args = parser.parse_args()
+
+    if args.case:
+        json.dump(run_case(args.case[0], args.case[1], args.repeat), \
+            sys.stdout)
+        return 0
+
+    results = run_all(args.repeat)
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, "r") as handle:
+            baseline = json.load(handle)
+    regressions = compare(results, baseline, args.tolerance, \
+        args.gate_time)
+    if args.save:
+        with open(BASELINE, "w") as handle:
+            json.dump(results, handle, indent = 1, sort_keys = True)
+    for regression in regressions:
+        print("REGRESSION: " + regression)
+    return 1 if regressions and not args.save else 0
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(HERE))
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Incremental season aggregation of event summaries. Requires numpy."""
+
+import numpy as np
+
+STATS = ("G", "A", "P", "+/-", "PN", "PIM", "S", "A/B", "MS", "HT", "GV", \
+    "TJ", "BS", "FW", "FL")
+"""Columns of every stats vector, in EventParser order"""
+
+def event_stats(values):
+    """Parse one player's EventParser stats into an int32 vector"""
+    stats = np.zeros(len(STATS), dtype = np.int32)
+    for i, value in enumerate(values):
+        value = value.replace(u"\xa0", u"").strip()
+        # Blank cells are zeros
+        if value.lstrip("-").isdigit():
+            stats[i] = int(value)
+    return stats
+
+def _grow(array, size, fill = 0):
+    """Return array with room for at least size rows, doubling as needed"""
+    if size <= len(array):
+        return array
+    grown = np.full((max(size, 2 * len(array)),) + array.shape[1:], fill, \
+        dtype = array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class SeasonAggregate(object):
+    """
+    Season, last-N-games and per-team totals of EventParser reports, updated
+    as each game is added so that every query is a lookup.
+
+    Players are counted per team: each (player, team) pair has its own row,
+    so namesakes on opposite sides of a game never share one, and a player
+    who changes teams has a row for each. Each row keeps its last `last`
+    game lines in a ring buffer next to their running sum; adding a game
+    overwrites the oldest line and adjusts the sum by the difference. Games
+    should be added in the order they were played. Adding a game again, e.g.
+    after its report was corrected, replaces its earlier contribution and
+    rebuilds the windows of its players.
+    """
+
+    def __init__(self, last = 10):
+        if not isinstance(last, int):
+            raise TypeError("last must be of type int")
+        if last < 1:
+            raise ValueError("last must be at least 1")
+        self.last = last
+        self.players = []
+        """(player, team) of every row; players are names or registry IDs"""
+        self.teams = []
+        """Team names, indexed by team row"""
+        self.__player_rows = {}
+        self.__rows_of = {}
+        self.__team_rows = {}
+        self.__game_ids = {}
+        self.__games = {}
+
+        width = len(STATS)
+        self.__totals = np.zeros((0, width), dtype = np.int32)
+        self.__played = np.zeros(0, dtype = np.int32)
+        self.__window = np.zeros((0, last, width), dtype = np.int32)
+        self.__window_game = np.full((0, last), -1, dtype = np.int64)
+        self.__window_pos = np.zeros(0, dtype = np.int32)
+        self.__recent = np.zeros((0, width), dtype = np.int32)
+        self.__team_totals = np.zeros((0, width), dtype = np.int32)
+        self.__team_games = np.zeros(0, dtype = np.int32)
+
+    def __player_row(self, player, team):
+        row = self.__player_rows.get((player, team))
+        if row is None:
+            row = self.__player_rows[(player, team)] = len(self.players)
+            self.players.append((player, team))
+            self.__rows_of.setdefault(player, []).append(row)
+            size = len(self.players)
+            self.__totals = _grow(self.__totals, size)
+            self.__played = _grow(self.__played, size)
+            self.__window = _grow(self.__window, size)
+            self.__window_pos = _grow(self.__window_pos, size)
+            self.__window_game = _grow(self.__window_game, size, -1)
+            self.__recent = _grow(self.__recent, size)
+        return row
+
+    def __team_row(self, team):
+        row = self.__team_rows.get(team)
+        if row is None:
+            row = self.__team_rows[team] = len(self.teams)
+            self.teams.append(team)
+            self.__team_totals = _grow(self.__team_totals, len(self.teams))
+            self.__team_games = _grow(self.__team_games, len(self.teams))
+        return row
+
+    def __remove(self, rows, stats, lines):
+        self.__totals[rows] -= stats
+        self.__played[rows] -= 1
+        np.subtract.at(self.__team_totals, lines, stats)
+        self.__team_games[np.unique(lines)] -= 1
+
+    def __refill(self, rows):
+        """Rebuild the windows of rows from the games they appear in"""
+        history = {row: [] for row in rows}
+        for key, game in self.__games.items():
+            for row, stats in zip(game[0].tolist(), game[1]):
+                if row in history:
+                    history[row].append((self.__game_ids[key], stats))
+        for row, games in history.items():
+            games = sorted(games, key = lambda game: game[0])[-self.last:]
+            self.__window[row] = 0
+            self.__window_game[row] = -1
+            for slot, (gid, stats) in enumerate(games):
+                self.__window[row, slot] = stats
+                self.__window_game[row, slot] = gid
+            self.__window_pos[row] = len(games) % self.last
+            self.__recent[row] = self.__window[row].sum(axis = 0)
+
+    def add(self, report, teams):
+        """
+        Add the events of report, an EventParser or its ReportResult. teams
+        names the sides, e.g. RosterParser.teams of the same game.
+        """
+        if teams["home"] == teams["away"]:
+            raise ValueError("home and away teams must differ")
+        key = (report.season, report.game_type.value, report.game_num)
+        gid = self.__game_ids.setdefault(key, len(self.__game_ids))
+        old = self.__games.pop(key, None)
+        if old is not None:
+            self.__remove(*old)
+
+        rows, stats, lines = [], [], []
+        for side, players in report.events.items():
+            team = self.__team_row(teams[side])
+            for player, values in players.items():
+                rows.append(self.__player_row(player, teams[side]))
+                stats.append(event_stats(values))
+                lines.append(team)
+        rows = np.array(rows, dtype = np.intp)
+        stats = np.array(stats, dtype = np.int32).reshape(-1, len(STATS))
+        lines = np.array(lines, dtype = np.intp)
+        np.add.at(self.__team_totals, lines, stats)
+        self.__team_games[np.unique(lines)] += 1
+        self.__totals[rows] += stats
+        self.__played[rows] += 1
+
+        self.__games[key] = (rows, stats, lines)
+        if old is not None:
+            # A corrected game may sit anywhere in the windows
+            self.__refill(set(rows.tolist()) | set(old[0].tolist()))
+            return
+        slots = self.__window_pos[rows].astype(np.intp)
+        self.__recent[rows] += stats - self.__window[rows, slots]
+        self.__window[rows, slots] = stats
+        self.__window_game[rows, slots] = gid
+        self.__window_pos[rows] = (slots + 1) % self.last
+
+    def __row(self, player, team):
+        if team is not None:
+            try:
+                return self.__player_rows[(player, team)]
+            except KeyError:
+                raise KeyError("no games for " + repr(player) + " with " + \
+                    repr(team))
+        rows = self.__rows_of.get(player)
+        if not rows:
+            raise KeyError("no games for " + repr(player))
+        if len(rows) > 1:
+            raise ValueError(repr(player) + " played for several teams, " \
+                "pass team")
+        return rows[0]
+
+    def season(self, player, team = None):
+        """
+        Season totals of player, in STATS order. team is needed only for
+        players with games for several teams.
+        """
+        return self.__totals[self.__row(player, team)].copy()
+
+    def recent(self, player, team = None):
+        """Totals of player over their last `last` games for team"""
+        return self.__recent[self.__row(player, team)].copy()
+
+    def games(self, player, team = None):
+        """Number of games player has appeared in for team"""
+        return int(self.__played[self.__row(player, team)])
+
+    def team_of(self, player):
+        """Team player appeared for in their latest game"""
+        try:
+            rows = self.__rows_of[player]
+        except KeyError:
+            raise KeyError("no games for " + repr(player))
+        latest = max(rows, key = lambda row: self.__window_game[row].max())
+        return self.players[latest][1]
+
+    def team(self, name):
+        """Season totals of every player line of team name"""
+        return self.__team_totals[self.__team_rows[name]].copy()
+
+    def team_games(self, name):
+        return int(self.__team_games[self.__team_rows[name]])
+
+    def table(self, window = "season"):
+        """
+        Return (players, array) with one row of totals per (player, team)
+        key of players, over the season or, with window="recent", their
+        last `last` games
+        """
+        if window not in ("season", "recent"):
+            raise ValueError("window must be season or recent")
+        totals = self.__totals if window == "season" else self.__recent
+        totals = totals[:len(self.players)]
+        totals.flags.writeable = False
+        return self.players, totals
+
+    def team_table(self):
+        """Return (teams, array) with one row of season totals per team"""
+        totals = self.__team_totals[:len(self.teams)]
+        totals.flags.writeable = False
+        return self.teams, totals
+
+    def __len__(self):
+        return len(self.__games)
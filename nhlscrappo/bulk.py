@@ -0,0 +1,276 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Concurrent fetching of whole seasons of reports"""
+
+from collections import namedtuple
+import nhlscrappo.constants as C
+from nhlscrappo import GameType, ReportType
+from nhlscrappo.fetcher import ReportFetcher
+from nhlscrappo.parsers import PARSERS
+
+BulkResult = namedtuple("BulkResult", ["season", "game_type", "game_num", \
+    "report_type", "report", "error"])
+"""
+Outcome of a single fetch. report is the parser (or ReportFetcher for report
+types without a parser) holding the parsed document, or a ReportResult when
+parsing happens out of process; error is the exception raised while fetching,
+or None on success.
+"""
+
+def game_numbers(season, game_type):
+    """Yield every game number of a season that should have RTSS reports"""
+    if game_type == GameType.Regular:
+        for num in range(1, C.GAME_CT_DICT[season] + 1):
+            if ("%04i%04i" % (season, num)) not in C.MISS_REG_GAMES:
+                yield num
+    elif game_type == GameType.Playoff:
+        # Playoff games are numbered 0RSG: round, series within the round and
+        # game within the series. Games that were never played simply 404.
+        for rnd in range(1, 5):
+            for series in range(1, (8 >> (rnd - 1)) + 1):
+                for game in range(1, 8):
+                    num = rnd * 100 + series * 10 + game
+                    if ("%04i%04i" % (season, num)) \
+                        not in C.MISS_PLAYOFF_GAMES:
+                        yield num
+    else:
+        raise TypeError("game_type must be of type GameType")
+
+def check_report_options(value):
+    """Validate a mapping of ReportType to parser keyword arguments"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise TypeError("report_options must be of type dict")
+    for report_type, options in value.items():
+        if not isinstance(report_type, ReportType):
+            raise TypeError("report_options must be keyed by ReportType")
+        if not isinstance(options, dict):
+            raise TypeError("report_options must map to dicts")
+    return dict(value)
+
+def make_report(season, game_num, game_type, report_type, \
+    report_options = None, **kwargs):
+    """
+    Instantiate the parser for report_type, or a bare ReportFetcher.
+    report_options maps a ReportType to extra keyword arguments for that
+    type only, e.g. {ReportType.Plays: {"only": ("plays",)}}.
+    """
+    if report_options and report_type in report_options:
+        kwargs.update(report_options[report_type])
+    if report_type in PARSERS:
+        return PARSERS[report_type](season, game_num, game_type, **kwargs)
+    return ReportFetcher(season, game_num, game_type, report_type, **kwargs)
+
+class BulkFetcher(object):
+    """
+    Fetch every report of one or more seasons through a bounded pool. Extra
+    keyword arguments (e.g. cache) are passed on to every report, and
+    report_options maps a ReportType to the options of its parser alone
+    (e.g. only, events or records for ReportType.Plays). games
+    limits the run to those game numbers of every season and game type and
+    backend is used by the reports whose parser supports it. With
+    results_only every report is extracted as soon as it is parsed and
+    yielded as a ReportResult, so no document outlives its worker; report
+    types without a parser are skipped, as they have no fields to extract.
+    """
+
+    def __init__(self, seasons, game_types = (GameType.Regular,), \
+        report_types = tuple(ReportType), max_workers = 8, \
+        results_only = False, games = None, backend = None, \
+        report_options = None, **options):
+        self.seasons = seasons
+        self.game_types = game_types
+        self.report_types = report_types
+        self.max_workers = max_workers
+        self.games = games
+        self.backend = backend
+        self.results_only = results_only
+        self.report_options = report_options
+        self.options = options
+
+    def jobs(self):
+        """Yield (season, game_type, game_num, report_type) for every report"""
+        for season in self.seasons:
+            for game_type in self.game_types:
+                games = self.games if self.games is not None \
+                    else game_numbers(season, game_type)
+                for game_num in games:
+                    for report_type in self.report_types:
+                        if self.results_only and report_type not in PARSERS:
+                            continue
+                        yield season, game_type, game_num, report_type
+
+    def _load(self, report):
+        """
+        Fetch and parse report and return what to yield as the result's
+        report, or None to leave it out of the results
+        """
+        report.make_document()
+        return self._finish(report)
+
+    def _finish(self, report):
+        """Return report, or only its extracted fields with results_only"""
+        if not self.results_only:
+            return report
+        report.load_all()
+        result = report.result()
+        report.release()
+        return result
+
+    def __fetch(self, season, game_type, game_num, report_type):
+        try:
+            report = make_report(season, game_num, game_type, report_type, \
+                self.report_options, **self.options)
+            if self.backend in report.backends:
+                report.backend = self.backend
+            report = self._load(report)
+            if report is None:
+                return None
+        except Exception as e:
+            return BulkResult(season, game_type, game_num, report_type, \
+                None, e)
+        return BulkResult(season, game_type, game_num, report_type, report, \
+            None)
+
+    def fetch(self):
+        """
+        Yield a BulkResult for every report as soon as it completes. At most
+        max_workers requests are in flight and failures do not stop the run.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, \
+            FIRST_COMPLETED
+        jobs = self.jobs()
+        pending = set()
+        with ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            while True:
+                # Keep the queue shallow so a full season isn't materialized
+                # as futures up front
+                for job in jobs:
+                    pending.add(pool.submit(self.__fetch, *job))
+                    if len(pending) >= self.max_workers * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result is not None:
+                        yield result
+
+    def __iter__(self):
+        return self.fetch()
+
+    @property
+    def seasons(self):
+        return self._seasons
+
+    @seasons.setter
+    def seasons(self, value):
+        if isinstance(value, int):
+            value = [value]
+        value = list(value)
+        for season in value:
+            if not isinstance(season, int):
+                raise TypeError("seasons must be of type int")
+            if season < C.MIN_SEASON or season > C.MAX_SEASON:
+                raise ValueError("Only seasons starting from " + \
+                    str(C.MIN_SEASON) + " until " + str(C.MAX_SEASON) + \
+                    " are supported")
+        self._seasons = value
+
+    @property
+    def game_types(self):
+        return self._game_types
+
+    @game_types.setter
+    def game_types(self, value):
+        if isinstance(value, GameType):
+            value = [value]
+        value = list(value)
+        if not all(isinstance(v, GameType) for v in value):
+            raise TypeError("game_types must be of type GameType")
+        self._game_types = value
+
+    @property
+    def report_types(self):
+        return self._report_types
+
+    @report_types.setter
+    def report_types(self, value):
+        if isinstance(value, ReportType):
+            value = [value]
+        value = list(value)
+        if not all(isinstance(v, ReportType) for v in value):
+            raise TypeError("report_types must be of type ReportType")
+        self._report_types = value
+
+    @property
+    def games(self):
+        return self._games
+
+    @games.setter
+    def games(self, value):
+        if value is not None:
+            value = list(value)
+            if not all(isinstance(v, int) for v in value):
+                raise TypeError("games must be of type int")
+        self._games = value
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        if value is not None and not isinstance(value, str):
+            raise TypeError("backend must be of type str")
+        self._backend = value
+
+    @property
+    def report_options(self):
+        return self._report_options
+
+    @report_options.setter
+    def report_options(self, value):
+        self._report_options = check_report_options(value)
+
+    @property
+    def results_only(self):
+        return self._results_only
+
+    @results_only.setter
+    def results_only(self, value):
+        if not isinstance(value, bool):
+            raise TypeError("results_only must be of type bool")
+        self._results_only = value
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, value):
+        if not isinstance(value, int):
+            raise TypeError("max_workers must be of type int")
+        if value < 1:
+            raise ValueError("max_workers must be at least 1")
+        self._max_workers = value
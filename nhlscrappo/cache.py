@@ -0,0 +1,135 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Persistent on-disk cache of raw report bytes"""
+
+import os
+import threading
+import zlib
+
+class ReportCache(object):
+    """
+    Compressed cache of raw reports keyed by their URL. Entries are evicted
+    least recently used first once the cache grows past max_size bytes.
+    """
+
+    __suffix = ".z"
+
+    def __init__(self, directory, max_size = 2 ** 30, level = 6):
+        self.directory = directory
+        self.max_size = max_size
+        self.level = level
+        self.__lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok = True)
+        self.__size = sum(os.path.getsize(path) for path in self.__entries())
+
+    def __entries(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(self.__suffix):
+                yield os.path.join(self.directory, name)
+
+    def __path(self, url):
+        import hashlib
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + self.__suffix)
+
+    def get(self, url):
+        """Return the cached bytes for url, or None on a miss"""
+        path = self.__path(url)
+        try:
+            with open(path, "rb") as handle:
+                data = handle.read()
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return zlib.decompress(data)
+
+    def put(self, url, data):
+        """Store data for url, evicting old entries if over max_size"""
+        path = self.__path(url)
+        data = zlib.compress(data, self.level)
+        import tempfile
+        fd, tmp = tempfile.mkstemp(dir = self.directory)
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        with self.__lock:
+            try:
+                self.__size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, path)
+            self.__size += len(data)
+            if self.__size > self.max_size:
+                self.__evict()
+
+    def __contains__(self, url):
+        return os.path.exists(self.__path(url))
+
+    def __evict(self):
+        entries = []
+        for path in self.__entries():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        for mtime, size, path in entries:
+            if self.__size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.__size -= size
+
+    def clear(self):
+        with self.__lock:
+            for path in self.__entries():
+                os.remove(path)
+            self.__size = 0
+
+    @property
+    def size(self):
+        """Total size of the compressed entries in bytes"""
+        return self.__size
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @directory.setter
+    def directory(self, value):
+        if not isinstance(value, str):
+            raise TypeError("directory must be of type str")
+        self._directory = value
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, value):
+        if not isinstance(value, int):
+            raise TypeError("max_size must be of type int")
+        if value < 0:
+            raise ValueError("max_size must not be negative")
+        self._max_size = value
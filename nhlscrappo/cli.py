@@ -0,0 +1,395 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Command line batch scraping of whole seasons, date ranges or game lists"""
+
+import argparse
+import datetime
+import json
+import re
+import sys
+import time
+import nhlscrappo.constants as C
+from nhlscrappo import GameType, ReportType, __version__
+from nhlscrappo.bulk import BulkFetcher, game_numbers
+from nhlscrappo.fetcher import ReportFetcher
+from nhlscrappo.parsers import PARSERS
+from nhlscrappo.records import Play
+
+FORMATS = ("jsonl", "parquet", "sqlite")
+"""Output formats of the nhlscrappo command"""
+
+_DATE = re.compile(rb"(?:Mon|Tues|Wednes|Thurs|Fri|Satur|Sun)day,\s+" \
+    rb"([A-Z][a-z]+)\s+(\d{1,2}),\s+(\d{4})")
+
+def _summary_date(raw):
+    match = _DATE.search(raw)
+    if match is None:
+        return None
+    return datetime.datetime.strptime(b" ".join(match.groups()).decode(), \
+        "%B %d %Y").date()
+
+def game_date(season, game_num, game_type, **kwargs):
+    """
+    Date of a game, read from the header of its game summary report, or None
+    if the report carries no date. kwargs are passed to the ReportFetcher.
+    """
+    report = ReportFetcher(season, game_num, game_type, ReportType.Summary, \
+        **kwargs)
+    with report._open_raw() as handle:
+        return _summary_date(handle.read())
+
+class _DateFetcher(BulkFetcher):
+    """BulkFetcher yielding the date of every game summary as its report"""
+
+    def _load(self, report):
+        with report._open_raw() as handle:
+            date = _summary_date(handle.read())
+        if date is None:
+            raise ValueError("no date in the game summary")
+        return date
+
+def _dates(season, game_type, games, max_workers, progress, kwargs):
+    """Dates of games looked up concurrently; failed lookups are left out"""
+    fetcher = _DateFetcher(season, game_types = game_type, \
+        report_types = ReportType.Summary, max_workers = max_workers, \
+        games = games, **kwargs)
+    dates = {}
+    for result in fetcher:
+        if progress is not None:
+            progress.update(result)
+        if result.error is None:
+            dates[result.game_num] = result.report
+    return dates
+
+def games_between(season, game_type, start, end, max_workers = 8, \
+    progress = None, **kwargs):
+    """
+    Game numbers of a season played from start to end inclusive. Summaries
+    are fetched max_workers at a time and every lookup is passed to
+    progress, a _Progress, if given; kwargs are passed to the reports.
+
+    Regular season games are numbered in schedule order, so each bound is
+    narrowed by a search probing up to max_workers games per round. Games
+    whose summary can't be dated are skipped by the search, and those left
+    undecided next to a bound are kept. Playoff games are all looked up.
+    """
+    games = list(game_numbers(season, game_type))
+    if game_type == GameType.Playoff:
+        # Games of series that ended early simply 404
+        dates = _dates(season, game_type, games, max_workers, progress, \
+            kwargs)
+        return [game_num for game_num in games if game_num in dates and \
+            start <= dates[game_num] <= end]
+
+    # Each bound is the index of the first game not played before it (on or
+    # after start, after end); lo and hi bracket it
+    bounds = {"start": [0, len(games)], "end": [0, len(games)]}
+    before = {"start": lambda date: date < start, \
+        "end": lambda date: date <= end}
+    tried = {}
+    while True:
+        probes = set()
+        for lo, hi in bounds.values():
+            untried = [i for i in range(lo, hi) if i not in tried]
+            step = len(untried) / (max_workers + 1)
+            probes.update(untried if step <= 1 else \
+                (untried[int(step * j)] for j in range(1, max_workers + 1)))
+        if not probes:
+            break
+        dates = _dates(season, game_type, [games[i] for i in probes], \
+            max_workers, progress, kwargs)
+        for i in probes:
+            tried[i] = dates.get(games[i])
+            if tried[i] is None:
+                continue
+            for name, bound in bounds.items():
+                if before[name](tried[i]):
+                    bound[0] = max(bound[0], i + 1)
+                else:
+                    bound[1] = min(bound[1], i)
+    return games[bounds["start"][0]:bounds["end"][1]]
+
+def _season_of(date):
+    # Seasons start in the fall and are named after their first year
+    return date.year if date.month >= 7 else date.year - 1
+
+def _report_type(value):
+    for report_type in ReportType:
+        if value in (report_type.value, report_type.name) or \
+            value.lower() == report_type.name.lower():
+            return report_type
+    raise argparse.ArgumentTypeError("unknown report type " + repr(value))
+
+def _game_list(value):
+    games = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        try:
+            games.extend(range(int(first), int(last or first) + 1))
+        except ValueError:
+            raise argparse.ArgumentTypeError("bad game list " + repr(value))
+    return games
+
+def _date(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError("dates must be YYYY-MM-DD")
+
+def _json_default(value):
+    if isinstance(value, Play):
+        return value.as_list()
+    raise TypeError(type(value).__name__ + " is not JSON serializable")
+
+class _JSONLWriter(object):
+    """One JSON object per report, with its fields as members"""
+
+    def __init__(self, path):
+        self.__handle = sys.stdout if path == "-" else open(path, "w")
+
+    def add(self, result):
+        record = {"season": result.season, \
+            "game_type": result.game_type.name, \
+            "game_num": result.game_num, \
+            "report_type": result.report_type.name}
+        for name in result.fields:
+            record[name] = getattr(result, name)
+        self.__handle.write(json.dumps(record, default = _json_default) \
+            + "\n")
+
+    def close(self):
+        if self.__handle is not sys.stdout:
+            self.__handle.close()
+
+class _SQLiteWriter(object):
+    """Every report loaded into the tables of a DatabaseLoader"""
+
+    def __init__(self, path):
+        from nhlscrappo.database import DatabaseLoader
+        self.__loader = DatabaseLoader(path)
+        self.__loader.create_tables()
+
+    def add(self, result):
+        self.__loader.add(result)
+
+    def close(self):
+        self.__loader.commit()
+        self.__loader.connection.close()
+
+class _ParquetWriter(object):
+    """Plays and shifts written to <prefix>_plays/_shifts.parquet"""
+
+    def __init__(self, prefix):
+        from nhlscrappo.export import ColumnarExport
+        self.__prefix = prefix
+        self.__export = ColumnarExport()
+
+    def add(self, result):
+        self.__export.add(result)
+
+    def close(self):
+        self.__export.write_parquet(self.__prefix + "_plays.parquet", \
+            self.__prefix + "_shifts.parquet")
+
+WRITERS = {"jsonl": _JSONLWriter, "sqlite": _SQLiteWriter, \
+    "parquet": _ParquetWriter}
+
+class _Progress(object):
+    """
+    Running count and throughput of a scrape, written to stream. total may
+    be None when it isn't known up front.
+    """
+
+    def __init__(self, total, stream, unit = "reports", interval = 1.0):
+        self.total = total
+        self.stream = stream
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self.missing = 0
+        self.failed = 0
+        self.__start = time.perf_counter()
+        self.__shown = self.__start
+
+    def update(self, result):
+        from urllib.error import HTTPError
+        self.done += 1
+        if isinstance(result.error, HTTPError) and result.error.code == 404:
+            self.missing += 1
+        elif result.error is not None:
+            self.failed += 1
+            self.__line("%i %s %i %s: %s\n" % (result.season, \
+                result.game_type.name, result.game_num, \
+                result.report_type.name, result.error))
+        now = time.perf_counter()
+        if now - self.__shown >= self.interval:
+            self.__shown = now
+            self.__line(self.__status(now))
+
+    def __status(self, now):
+        elapsed = max(now - self.__start, 1e-9)
+        done = str(self.done) if self.total is None else \
+            "%i/%i" % (self.done, self.total)
+        return "%s %s, %i missing, %i failed, %.1f %s/s" % (done, \
+            self.unit, self.missing, self.failed, self.done / elapsed, \
+            self.unit)
+
+    def __line(self, text):
+        if self.stream is not None:
+            self.stream.write("\r\033[K" + text)
+            self.stream.flush()
+
+    def finish(self):
+        now = time.perf_counter()
+        self.__line(self.__status(now) + " in %.1f s\n" % \
+            (now - self.__start))
+
+def _arguments():
+    parser = argparse.ArgumentParser(prog = "nhlscrappo", \
+        description = "Scrape NHL.com RTSS reports in bulk")
+    parser.add_argument("--version", action = "version", \
+        version = "%(prog)s " + __version__)
+    select = parser.add_mutually_exclusive_group(required = True)
+    select.add_argument("-s", "--season", type = int, nargs = "+", \
+        help = "seasons to scrape, named by their first year")
+    select.add_argument("-d", "--dates", type = _date, nargs = 2, \
+        metavar = ("FROM", "TO"), help = "scrape games played in this range")
+    parser.add_argument("-g", "--games", type = _game_list, \
+        help = "game numbers of the seasons to scrape, e.g. 1-20,45")
+    parser.add_argument("-t", "--game-type", default = "regular", \
+        choices = ("regular", "playoff", "all"))
+    parser.add_argument("-r", "--reports", type = _report_type, \
+        nargs = "+", default = list(PARSERS), metavar = "REPORT", \
+        help = "report types by code or name (default: every parsed type)")
+    parser.add_argument("-f", "--format", choices = FORMATS, \
+        default = "jsonl")
+    parser.add_argument("-o", "--output", default = "-", \
+        help = "output file, or prefix for parquet (default: stdout)")
+    parser.add_argument("-w", "--workers", type = int, default = 8, \
+        help = "concurrent downloads")
+    parser.add_argument("-p", "--processes", type = int, default = 0, \
+        help = "parse in this many worker processes")
+    parser.add_argument("-c", "--cache", metavar = "DIR", \
+        help = "cache raw reports in DIR")
+    parser.add_argument("--rate", type = float, \
+        help = "requests per second (default: unthrottled)")
+    parser.add_argument("--backend", default = "lxml", \
+        choices = ("soup", "lxml"), \
+        help = "extraction backend where the parser supports it")
+    parser.add_argument("-q", "--quiet", action = "store_true")
+    return parser
+
+def main(argv = None):
+    parser = _arguments()
+    args = parser.parse_args(argv)
+    if args.dates and args.games:
+        parser.error("--games applies to --season only")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.processes < 0:
+        parser.error("--processes must not be negative")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    unparsed = [report_type.value for report_type in args.reports \
+        if report_type not in PARSERS]
+    if unparsed:
+        parser.error("no parser for " + ", ".join(unparsed))
+    for season in args.season or ():
+        if season < C.MIN_SEASON or season > C.MAX_SEASON:
+            parser.error("--season must be from " + str(C.MIN_SEASON) + \
+                " until " + str(C.MAX_SEASON))
+    if args.format == "sqlite":
+        extra = set(args.reports) - {ReportType.Roster, ReportType.Shots, \
+            ReportType.HomeTOI, ReportType.AwayTOI, ReportType.Events, \
+            ReportType.Plays}
+        if extra:
+            parser.error("sqlite output holds only Roster, Shots, HomeTOI, " \
+                "AwayTOI, Events and Plays reports")
+    if args.format == "parquet":
+        if args.output == "-":
+            parser.error("parquet output needs --output PREFIX")
+        extra = set(args.reports) - {ReportType.Plays, ReportType.HomeTOI, \
+            ReportType.AwayTOI}
+        if extra:
+            parser.error("parquet output holds only Plays, HomeTOI and " \
+                "AwayTOI reports")
+    game_types = [GameType.Regular, GameType.Playoff] \
+        if args.game_type == "all" else [GameType[args.game_type.title()]]
+
+    options = {}
+    if args.cache:
+        from nhlscrappo.cache import ReportCache
+        options["cache"] = ReportCache(args.cache)
+    if args.rate:
+        from nhlscrappo.scheduler import RequestScheduler
+        options["scheduler"] = RequestScheduler(rate = args.rate, \
+            concurrency = args.workers, max_concurrency = args.workers)
+
+    stream = None if args.quiet else sys.stderr
+    lookups = None
+    if args.dates:
+        start, end = args.dates
+        seasons = range(max(_season_of(start), C.MIN_SEASON), \
+            min(_season_of(end), C.MAX_SEASON) + 1)
+        lookups = _Progress(None, stream, "game summaries")
+        batches = [(season, game_type, games_between(season, game_type, \
+            start, end, args.workers, lookups, **options)) \
+            for season in seasons for game_type in game_types]
+        lookups.finish()
+    else:
+        batches = [(season, game_type, args.games) \
+            for season in args.season for game_type in game_types]
+
+    pool = None
+    if args.processes:
+        from nhlscrappo.pool import ParsePool, PoolFetcher
+        pool = ParsePool(args.processes, args.backend)
+    fetchers = []
+    for season, game_type, games in batches:
+        kwargs = dict(options, game_types = game_type, \
+            report_types = args.reports, max_workers = args.workers, \
+            games = games)
+        if pool is not None:
+            fetchers.append(PoolFetcher(pool, season, **kwargs))
+        else:
+            fetchers.append(BulkFetcher(season, results_only = True, \
+                backend = args.backend, **kwargs))
+
+    total = sum(1 for fetcher in fetchers for job in fetcher.jobs())
+    progress = _Progress(total, stream)
+    writer = WRITERS[args.format](args.output)
+    try:
+        for fetcher in fetchers:
+            for result in fetcher:
+                progress.update(result)
+                if result.error is None:
+                    writer.add(result.report)
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.close()
+        progress.finish()
+    return 1 if progress.failed or \
+        (lookups is not None and lookups.failed) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -201,7 +201,7 @@ MISS_REG_GAMES = [
 """Regular season games without RTSS data on NHL.com in the format: YYYYNNNN"""
 
 MISS_PLAYOFF_GAMES = [
-  "20040134"
+  "20040134",
   "20060233"
 ]
 """Playoff games without RTSS data on NHL.com in the format: YYYYNNNN"""
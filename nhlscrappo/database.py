@@ -0,0 +1,209 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Bulk loading of parsed reports into a relational database"""
+
+import sqlite3
+from nhlscrappo import PlayType, ReportType
+from nhlscrappo.records import Play, to_seconds
+
+_GAME = ("season INTEGER NOT NULL", "game_type INTEGER NOT NULL", \
+    "game_num INTEGER NOT NULL")
+
+SCHEMA = {
+    "teams": _GAME + ("side TEXT NOT NULL", "name TEXT"),
+    "rosters": _GAME + ("side TEXT NOT NULL", "name TEXT NOT NULL", \
+        "num INTEGER", "pos TEXT", "scratched INTEGER NOT NULL"),
+    "coaches": _GAME + ("side TEXT NOT NULL", "name TEXT"),
+    "officials": _GAME + ("role TEXT NOT NULL", "num INTEGER", "name TEXT"),
+    "shots": _GAME + ("side TEXT NOT NULL", "name TEXT NOT NULL", \
+        "period INTEGER NOT NULL", "ev INTEGER", "pp INTEGER", "sh INTEGER", \
+        "tot INTEGER"),
+    "events": _GAME + ("side TEXT NOT NULL", "name TEXT NOT NULL", \
+        "g INTEGER", "a INTEGER", "p INTEGER", "plus_minus INTEGER", \
+        "pn INTEGER", "pim INTEGER", "s INTEGER", "ab INTEGER", \
+        "ms INTEGER", "ht INTEGER", "gv INTEGER", "tj INTEGER", \
+        "bs INTEGER", "fw INTEGER", "fl INTEGER"),
+    "shifts": _GAME + ("side TEXT NOT NULL", "name TEXT NOT NULL", \
+        "period INTEGER NOT NULL", "shift INTEGER NOT NULL", \
+        "start INTEGER NOT NULL", "end_time INTEGER NOT NULL", "event TEXT"),
+    "plays": _GAME + ("number INTEGER NOT NULL", "period INTEGER NOT NULL", \
+        "strength TEXT", "elapsed INTEGER NOT NULL", "event TEXT NOT NULL", \
+        "description TEXT"),
+    "play_on_ice": _GAME + ("number INTEGER NOT NULL", \
+        "side TEXT NOT NULL", "jersey INTEGER NOT NULL", "pos TEXT")
+}
+"""Columns of every table, one row per parsed entity"""
+
+_PLACEHOLDERS = {"qmark": "?", "format": "%s", "numeric": ":%i", \
+    "named": ":c%i", "pyformat": "%%(c%i)s"}
+
+def _int(value):
+    """Parse a report cell into an int, None for blank cells"""
+    if value is None:
+        return None
+    value = value.replace(u"\xa0", u"").strip()
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+class DatabaseLoader(object):
+    """
+    Insert parsed reports through batched executemany calls. Rows are
+    buffered per table and written batch_size at a time; nothing is
+    committed until commit() (or leaving a with block), so a whole season
+    can go in as a few large transactions.
+
+    connection may be any DB-API connection, with paramstyle naming its
+    module's placeholder style, or a path for a SQLite database.
+    """
+
+    def __init__(self, connection = ":memory:", paramstyle = None, \
+        batch_size = 5000):
+        if isinstance(connection, str):
+            connection = sqlite3.connect(connection)
+            paramstyle = paramstyle or sqlite3.paramstyle
+        self.connection = connection
+        self.paramstyle = paramstyle or "qmark"
+        self.batch_size = batch_size
+        self.rows = 0
+        """Rows written so far"""
+        self.__pending = {table: [] for table in SCHEMA}
+
+    def create_tables(self):
+        cursor = self.connection.cursor()
+        for table, columns in SCHEMA.items():
+            cursor.execute("CREATE TABLE IF NOT EXISTS %s (%s)" % (table, \
+                ", ".join(columns)))
+        cursor.close()
+
+    def __insert(self, table):
+        rows = self.__pending[table]
+        if not rows:
+            return
+        names = [c.split(" ")[0] for c in SCHEMA[table]]
+        marks = _PLACEHOLDERS[self.paramstyle]
+        if "%i" in marks:
+            marks = ", ".join(marks % i for i in range(len(names)))
+        else:
+            marks = ", ".join([marks] * len(names))
+        if self.paramstyle in ("named", "pyformat"):
+            rows = [{"c%i" % i: v for i, v in enumerate(row)} for row in rows]
+        cursor = self.connection.cursor()
+        cursor.executemany("INSERT INTO %s (%s) VALUES (%s)" % (table, \
+            ", ".join(names), marks), rows)
+        cursor.close()
+        self.rows += len(self.__pending[table])
+        self.__pending[table] = []
+
+    def __add_rows(self, table, rows):
+        pending = self.__pending[table]
+        pending.extend(rows)
+        if len(pending) >= self.batch_size:
+            self.__insert(table)
+
+    def flush(self):
+        """Write every buffered row"""
+        for table in self.__pending:
+            self.__insert(table)
+
+    def commit(self):
+        self.flush()
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.connection.rollback()
+
+    def add(self, parser):
+        """Queue the loaded fields of any parser, or of its ReportResult"""
+        key = (parser.season, parser.game_type.value, parser.game_num)
+        if parser.report_type == ReportType.Roster:
+            self.add_roster(key, parser)
+        elif parser.report_type == ReportType.Shots:
+            self.add_shots(key, parser.shots)
+        elif parser.report_type in (ReportType.HomeTOI, ReportType.AwayTOI):
+            side = "home" if parser.report_type == ReportType.HomeTOI \
+                else "away"
+            self.add_shifts(key, side, parser.players)
+        elif parser.report_type == ReportType.Events:
+            self.add_events(key, parser.events)
+        elif parser.report_type == ReportType.Plays:
+            self.add_plays(key, parser.plays)
+        else:
+            raise TypeError("no tables for " + parser.report_type.name)
+
+    def add_roster(self, key, roster):
+        self.__add_rows("teams", (key + (side, name) for side, name \
+            in roster.teams.items()))
+        for scratched, players in ((0, roster.rosters), \
+            (1, roster.scratches)):
+            self.__add_rows("rosters", (key + (side, name, \
+                _int(stats["num"]), stats["pos"], scratched) \
+                for side, team in players.items() \
+                for name, stats in team.items()))
+        self.__add_rows("coaches", (key + (side, name) for side, name \
+            in roster.coaches.items()))
+        self.__add_rows("officials", (key + (role, num, name) \
+            for role, people in roster.officials.items() \
+            for num, name in people.items()))
+
+    def add_shots(self, key, shots):
+        # Numeric TeamShots hold ints, with zeros for blank cells
+        self.__add_rows("shots", (key + (side, name, period) + \
+            tuple(s[k] if isinstance(s[k], int) else _int(s[k]) \
+            for k in ("EV", "PP", "SH", "TOT")) \
+            for side, players in shots.items() \
+            for name, periods in players.items() \
+            for period, s in periods.items()))
+
+    def add_events(self, key, events):
+        self.__add_rows("events", (key + (side, name) + \
+            tuple(_int(v) for v in stats) \
+            for side, players in events.items() \
+            for name, stats in players.items()))
+
+    def add_shifts(self, key, side, players):
+        self.__add_rows("shifts", (key + (side, name, \
+            4 if period == "OT" else int(period), int(shift), \
+            to_seconds(start), to_seconds(end), event.strip() or None) \
+            for name, periods in players.items() \
+            for period, shifts in periods.items() \
+            for shift, start, end, event in shifts))
+
+    def add_plays(self, key, plays):
+        plays = [p if isinstance(p, Play) else Play.from_list(p) \
+            for p in plays]
+        self.__add_rows("plays", (key + (p.number, p.period, \
+            p.strength.value if p.strength is not None else None, \
+            p.elapsed, p.event.value if isinstance(p.event, PlayType) \
+            else p.event, p.description) for p in plays))
+        self.__add_rows("play_on_ice", (key + (p.number, side, n, pos) \
+            for p in plays \
+            for side, jerseys, positions in \
+                (("away", p.away_on_ice, p.away_positions), \
+                ("home", p.home_on_ice, p.home_positions)) \
+            for n, pos in zip(jerseys, positions)))
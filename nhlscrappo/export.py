@@ -0,0 +1,210 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Columnar export of parsed plays and shifts. Requires numpy; writing Parquet
+additionally requires pyarrow.
+"""
+
+from array import array
+import numpy as np
+from nhlscrappo import PlayType, ReportType
+from nhlscrappo.records import Play, to_seconds
+
+class Dictionary(object):
+    """Dictionary encoding of repeated strings to integer codes"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class ColumnarExport(object):
+    """
+    Collect plays and shifts from many games into columnar buffers.
+
+    Plays are one row per event. The jerseys on the ice are stored flat in
+    away_on_ice/home_on_ice, with row i's jerseys between offsets[i] and
+    offsets[i + 1]. Shifts are one row per shift, with team 0 for home and
+    1 for away. Strings are dictionary encoded: a column named X holds codes
+    into the array X_values.
+    """
+
+    __play_columns = (("season", "H"), ("game_type", "b"), \
+        ("game_num", "H"), ("number", "H"), ("period", "b"), \
+        ("elapsed", "H"), ("strength", "i"), ("event", "i"), \
+        ("description", "i"))
+    __shift_columns = (("season", "H"), ("game_type", "b"), \
+        ("game_num", "H"), ("team", "b"), ("player", "i"), ("period", "b"), \
+        ("shift", "H"), ("start", "H"), ("end", "H"), ("event", "i"))
+
+    def __init__(self):
+        self.__plays = {name: array(code) for name, code \
+            in self.__play_columns}
+        self.__shifts = {name: array(code) for name, code \
+            in self.__shift_columns}
+        for side in ("away", "home"):
+            self.__plays[side + "_on_ice"] = array("B")
+            self.__plays[side + "_offsets"] = array("I", [0])
+        self.__strings = {"strength": Dictionary(), "event": Dictionary(), \
+            "description": Dictionary(), "player": Dictionary(), \
+            "shift_event": Dictionary()}
+
+    def add(self, parser):
+        """
+        Add the loaded plays or shifts of a PlayParser or TOIParser, or of
+        the ReportResult of one
+        """
+        key = (parser.season, parser.game_type.value, parser.game_num)
+        if parser.report_type == ReportType.Plays:
+            self.add_plays(key, parser.plays)
+        elif parser.report_type in (ReportType.HomeTOI, ReportType.AwayTOI):
+            team = 0 if parser.report_type == ReportType.HomeTOI else 1
+            self.add_shifts(key, team, parser.players)
+        else:
+            raise TypeError("parser must be a PlayParser or TOIParser")
+
+    def add_plays(self, key, plays):
+        """Add plays (lists or Play records) of the game key"""
+        cols = self.__plays
+        strings = self.__strings
+        season, game_type, game_num = key
+        for play in plays:
+            if not isinstance(play, Play):
+                play = Play.from_list(play)
+            cols["season"].append(season)
+            cols["game_type"].append(game_type)
+            cols["game_num"].append(game_num)
+            cols["number"].append(play.number)
+            cols["period"].append(play.period)
+            cols["elapsed"].append(play.elapsed)
+            cols["strength"].append(strings["strength"].encode( \
+                play.strength.value if play.strength is not None else ""))
+            cols["event"].append(strings["event"].encode( \
+                play.event.value if isinstance(play.event, PlayType) \
+                else play.event))
+            cols["description"].append( \
+                strings["description"].encode(play.description))
+            for side, on_ice in (("away", play.away_on_ice), \
+                ("home", play.home_on_ice)):
+                cols[side + "_on_ice"].extend(on_ice)
+                cols[side + "_offsets"].append(len(cols[side + "_on_ice"]))
+
+    def add_shifts(self, key, team, players):
+        """Add the TOIParser players of one team (0 home, 1 away)"""
+        cols = self.__shifts
+        strings = self.__strings
+        season, game_type, game_num = key
+        for name, periods in players.items():
+            player = strings["player"].encode(name)
+            for period, shifts in periods.items():
+                period = 4 if period == "OT" else int(period)
+                for shift, start, end, event in shifts:
+                    cols["season"].append(season)
+                    cols["game_type"].append(game_type)
+                    cols["game_num"].append(game_num)
+                    cols["team"].append(team)
+                    cols["player"].append(player)
+                    cols["period"].append(period)
+                    cols["shift"].append(int(shift))
+                    cols["start"].append(to_seconds(start))
+                    cols["end"].append(to_seconds(end))
+                    cols["event"].append( \
+                        strings["shift_event"].encode(event.strip()))
+
+    def plays(self):
+        """Return the plays as a dict of numpy arrays"""
+        table = {name: np.array(col) for name, col \
+            in self.__plays.items()}
+        for name in ("strength", "event", "description"):
+            table[name + "_values"] = np.array(self.__strings[name].values, \
+                dtype = object)
+        return table
+
+    def shifts(self):
+        """Return the shifts as a dict of numpy arrays"""
+        table = {name: np.array(col) for name, col \
+            in self.__shifts.items()}
+        table["player_values"] = np.array(self.__strings["player"].values, \
+            dtype = object)
+        table["event_values"] = np.array( \
+            self.__strings["shift_event"].values, dtype = object)
+        return table
+
+    def save_npz(self, path):
+        """Write plays and shifts to a single compressed .npz archive"""
+        arrays = {}
+        for prefix, table in (("plays", self.plays()), \
+            ("shifts", self.shifts())):
+            for name, col in table.items():
+                if col.dtype == object:
+                    col = col.astype(str) if len(col) else col.astype("U1")
+                arrays[prefix + "/" + name] = col
+        np.savez_compressed(path, **arrays)
+
+    def write_parquet(self, plays_path, shifts_path):
+        """Write plays and shifts as Parquet files with dictionary columns"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def to_arrow(table, strings, lists):
+            columns = {}
+            for name, col in table.items():
+                if name.endswith("_values") or name.endswith("_offsets"):
+                    continue
+                if name in strings:
+                    columns[name] = pa.DictionaryArray.from_arrays( \
+                        pa.array(col, type = pa.int32()), \
+                        pa.array(list(table[name + "_values"]), \
+                            type = pa.string()))
+                elif name in lists:
+                    columns[name] = pa.ListArray.from_arrays( \
+                        pa.array(table[name.replace("on_ice", "offsets")], \
+                            type = pa.int32()), pa.array(col))
+                else:
+                    columns[name] = pa.array(col)
+            return pa.table(columns)
+
+        pq.write_table(to_arrow(self.plays(), ("strength", "event", \
+            "description"), ("away_on_ice", "home_on_ice")), plays_path)
+        pq.write_table(to_arrow(self.shifts(), ("player", "event"), ()), \
+            shifts_path)
+
+def load_npz(path):
+    """
+    Read an archive written by ColumnarExport.save_npz and return
+    {"plays": {column: array}, "shifts": {column: array}}
+    """
+    tables = {"plays": {}, "shifts": {}}
+    with np.load(path) as archive:
+        for key in archive.files:
+            prefix, name = key.split("/", 1)
+            tables[prefix][name] = archive[key]
+    return tables
+
+def decode(table, name):
+    """Expand the dictionary encoded column name back to its strings"""
+    return table[name + "_values"][table[name]]
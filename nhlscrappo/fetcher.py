@@ -18,25 +18,53 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import random
-from bs4 import BeautifulSoup
-from urllib.request import urlopen, Request
+import contextlib
+import io
+import mmap
 import nhlscrappo.constants as C
 from nhlscrappo import GameType, ReportType
+from nhlscrappo.cache import ReportCache
+from nhlscrappo.identity import Registry
+from nhlscrappo.metrics import Metrics
+from nhlscrappo.records import ReportResult, plain
+from nhlscrappo.scheduler import RequestScheduler
+from nhlscrappo.transport import HTTPTransport, DEFAULT_TRANSPORT
+
+_BYTES = (bytes, bytearray, memoryview, mmap.mmap)
+"""Local report contents used as they are rather than read as files"""
 
 class ReportFetcher(object):
     """Responsible for fetching and validating the report fields"""
 
     __docroot = "http://www.nhl.com/"
 
-    def __init__(self, season, game_num, game_type, report_type):
+    backends = ("soup",)
+    """Extraction backends supported by the parser"""
+
+    fields = ()
+    """Attributes holding the parser's extracted data"""
+
+    def __init__(self, season, game_num, game_type, report_type, \
+        cache = None, transport = None, timeout = None, backend = "soup", \
+        scheduler = None, metrics = None, only = None, registry = None):
         self.season = season
         self.game_num = game_num
         self.game_type = game_type
         self.report_type = report_type
+        self.cache = cache
+        self.transport = transport if transport is not None \
+            else DEFAULT_TRANSPORT
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.backend = backend
+        self.only = only
+        self.registry = registry
         self.soup = None
+        self.tree = None
 
     def __random_user_agent(self):
+        import random
         user_agent_list = [ \
             "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.1 (KHTML, " \
                 "like Gecko) Chrome/22.0.1207.1 Safari/537.1", \
@@ -76,36 +104,232 @@ class ReportFetcher(object):
                 "like Gecko) Chrome/19.0.1055.1 Safari/535.24"]
         return random.choice(user_agent_list)
 
-    def __load_html(self, url):
-        if "http://" in url:
-            req = Request(url, headers = {
-                "User-Agent": self.__random_user_agent(), \
-                "Accept": "text/html,application/xhtml+xml,application/" \
-                    "xml;q=0.9,*/*;q=0.8", \
-                "Accept-Charset": "ISO-8859-1,utf-8;q=0.7,*;q=0.3", \
-                "Accept-Encoding": "none", \
-                "Accept-Language": "en-US,en;q=0.8", \
-                "Connection": "keep-alive"})
-            with urlopen(req) as handle:
-                html = handle.read()
-                handle.close()
-                return BeautifulSoup(html.decode("utf-8", "lxml"))
+    def __request(self, url, headers = None):
+        request_headers = {
+            "User-Agent": self.__random_user_agent(), \
+            "Accept": "text/html,application/xhtml+xml,application/" \
+                "xml;q=0.9,*/*;q=0.8", \
+            "Accept-Charset": "ISO-8859-1,utf-8;q=0.7,*;q=0.3", \
+            "Accept-Encoding": "gzip, deflate", \
+            "Accept-Language": "en-US,en;q=0.8", \
+            "Connection": "keep-alive"}
+        request_headers.update(headers or {})
+        with self._timer("network"):
+            if self.scheduler is None:
+                resp = self.transport.get(url, headers = request_headers, \
+                    timeout = self.timeout)
+            else:
+                resp = self.scheduler.call(lambda: self.transport.get(url, \
+                    headers = request_headers, timeout = self.timeout))
+        if self.metrics is not None:
+            # Bytes transferred, falling back to the body for transports
+            # that don't count them
+            self.metrics.record(self, "bytes", len(resp.body) \
+                if resp.wire_bytes is None else resp.wire_bytes)
+        return resp
+
+    def __fetch_html(self, url):
+        resp = self.__request(url)
+        if resp.status != 200:
+            from urllib.error import HTTPError
+            raise HTTPError(url, resp.status, resp.reason, resp.headers, \
+                None)
+        return resp.body
+
+    def fetch(self, etag = None, last_modified = None):
+        """
+        Fetch the report from NHL.com, bypassing any cached copy. When
+        validators from an earlier response are given the request is made
+        conditional and the returned Response has status 304 if the report
+        has not changed. A fresh body is stored in the cache.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        resp = self.__request(self.url, headers)
+        if resp.status not in (200, 304):
+            from urllib.error import HTTPError
+            raise HTTPError(self.url, resp.status, resp.reason, \
+                resp.headers, None)
+        if resp.status == 200 and self.cache is not None:
+            self.cache.put(self.url, resp.body)
+        if resp.status == 304 and self.metrics is not None:
+            self.metrics.record(self, "not_modified", 1)
+        return resp
+
+    def _timer(self, stage):
+        """Context timing stage for the metrics, if any are collected"""
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.timer(self, stage)
+
+    def __soup_from(self, raw):
+        from bs4 import BeautifulSoup
+        # The bytes go to the parser undecoded so the character set is taken
+        # from the BOM or <meta> declaration. BeautifulSoup only accepts
+        # bytes proper, so other buffers are copied once.
+        if not isinstance(raw, bytes):
+            raw = bytes(raw)
+        with self._timer("tree"):
+            return BeautifulSoup(raw, features="lxml", \
+                parse_only = self.strainer())
+
+    def __tree_from(self, raw):
+        import lxml.html
+        with self._timer("tree"):
+            return lxml.html.document_fromstring(raw)
+
+    def parse(self, raw):
+        """
+        Build the backend's document from raw report bytes, or any buffer
+        such as a memoryview or mmap
+        """
+        if self.backend == "lxml":
+            self.tree = self.__tree_from(raw)
+            return self.tree
+        self.soup = self.__soup_from(raw)
+        return self.soup
+
+    def row_count(self):
+        """Number of entities extracted so far, for the metrics"""
+        return 0
+
+    def _person(self, name, team = None):
+        """
+        Key for the person name of team: their registry ID, or the name
+        itself
+        """
+        if self.registry is None:
+            return name
+        return self.registry.id(name, team)
+
+    def _wants(self, name):
+        """Whether the field name was requested through only"""
+        return self.only is None or name in self.only
+
+    def strainer(self):
+        """
+        SoupStrainer limiting the soup to what the requested fields need, or
+        None to build the whole document
+        """
+        return None
+
+    def result(self):
+        """Return a ReportResult holding plain copies of the fields"""
+        return ReportResult(self.season, self.game_num, self.game_type, \
+            self.report_type, {name: plain(getattr(self, name)) \
+            for name in self.fields if self._wants(name)})
+
+    def release(self):
+        """
+        Drop the document once extraction is done and keep only the fields.
+        The soup is decomposed first so its reference cycles are freed right
+        away instead of waiting for the garbage collector.
+        """
+        for name in self.fields:
+            setattr(self, name, plain(getattr(self, name)))
+        if self.soup is not None:
+            self.soup.decompose()
+        self.soup = None
+        self.tree = None
+
+    def __load_raw(self, url):
+        html = self.cache.get(url) if self.cache is not None else None
+        if self.cache is not None and self.metrics is not None:
+            self.metrics.record(self, "cache_miss" if html is None \
+                else "cache_hit", 1)
+        if html is None:
+            html = self.__fetch_html(url)
+            if self.cache is not None:
+                self.cache.put(url, html)
+        return html
+
+    @contextlib.contextmanager
+    def _local_raw(self, local):
+        """
+        Undecoded contents of local: a path, which is memory-mapped rather
+        than read, a bytes-like object (including an mmap) or a binary file
+        object
+        """
+        if isinstance(local, str):
+            with open(local, "rb") as handle:
+                try:
+                    view = mmap.mmap(handle.fileno(), 0, \
+                        access = mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty files can't be mapped
+                    yield b""
+                    return
+                with view:
+                    yield view
+        elif isinstance(local, _BYTES):
+            # Checked first: an mmap also has a read() from its position
+            yield local
         else:
-            with open(url, "r") as handle:
-                html = handle.read()
-                handle.close()
-                return BeautifulSoup(html, features="lxml")
+            yield local.read()
+
+    def __load_html(self, url):
+        if isinstance(url, str) and "http://" in url:
+            return self.__soup_from(self.__load_raw(url))
+        with self._local_raw(url) as raw:
+            return self.__soup_from(raw)
+
+    def _open_raw(self, local = None):
+        """Return a binary file object over the undecoded report"""
+        if local is None:
+            return io.BytesIO(self.__load_raw(self.url))
+        if isinstance(local, str):
+            return open(local, "rb")
+        if isinstance(local, _BYTES):
+            return io.BytesIO(local)
+        # The caller's file stays open
+        return contextlib.nullcontext(local)
+
+    def __load_tree(self, url):
+        if isinstance(url, str) and "http://" in url:
+            return self.__tree_from(self.__load_raw(url))
+        with self._local_raw(url) as raw:
+            return self.__tree_from(raw)
+
+    @property
+    def url(self):
+        """Location of the report on NHL.com"""
+        return self.__docroot + "scores/htmlreports/" + str(self.season) + \
+            str(self.season + 1) + "/" + self.report_type.value + "0" + \
+            str(self.game_type.value) + ("%04i" % self.game_num) + ".HTM"
 
     def make_soup(self, local = None):
-        if local:
+        """
+        Parse the report into a soup. local may be a path, bytes-like object
+        or binary file object to parse instead of fetching the report.
+        """
+        if local is not None:
             self.soup = self.__load_html(local)
         else:
-            url = self.__docroot + "scores/htmlreports/" + str(self.season) + \
-                str(self.season + 1) + "/" + self.report_type.value + "0" + \
-                str(self.game_type.value) + ("%04i" % self.game_num) + ".HTM"
-            self.soup = self.__load_html(url)
+            self.soup = self.__load_html(self.url)
         return self.soup
 
+    def load_all(self):
+        """
+        Load every field the report supports in a single call. A bare
+        ReportFetcher, as made for report types without a parser (the game
+        summary and faceoff reports), has no fields and loads nothing.
+        """
+        pass
+
+    def make_tree(self, local = None):
+        """Parse the report into an lxml tree for the lxml backend"""
+        self.tree = self.__load_tree(local if local is not None else self.url)
+        return self.tree
+
+    def make_document(self, local = None):
+        """Build whichever tree the selected backend extracts from"""
+        if self.backend == "lxml":
+            return self.make_tree(local)
+        return self.make_soup(local)
+
     @property
     def season(self):
         return self._season
@@ -152,12 +376,133 @@ class ReportFetcher(object):
         else:
             raise TypeError("report_type must be of type ReportType")
 
+    @property
+    def cache(self):
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        if value is not None and not isinstance(value, ReportCache):
+            raise TypeError("cache must be of type ReportCache")
+        self._cache = value
+
+    @property
+    def transport(self):
+        return self._transport
+
+    @transport.setter
+    def transport(self, value):
+        if not isinstance(value, HTTPTransport):
+            raise TypeError("transport must be of type HTTPTransport")
+        self._transport = value
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        if value is not None and not isinstance(value, (int, float)):
+            raise TypeError("timeout must be of type int or float")
+        self._timeout = value
+
+    @property
+    def scheduler(self):
+        return self._scheduler
+
+    @scheduler.setter
+    def scheduler(self, value):
+        if value is not None and not isinstance(value, RequestScheduler):
+            raise TypeError("scheduler must be of type RequestScheduler")
+        self._scheduler = value
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, value):
+        if value is not None and not isinstance(value, Metrics):
+            raise TypeError("metrics must be of type Metrics")
+        self._metrics = value
+
+    @property
+    def registry(self):
+        return self._registry
+
+    @registry.setter
+    def registry(self, value):
+        if value is not None and not isinstance(value, Registry):
+            raise TypeError("registry must be of type Registry")
+        self._registry = value
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        if value not in self.backends:
+            raise ValueError("backend must be one of " + \
+                ", ".join(self.backends))
+        self._backend = value
+
+    @property
+    def only(self):
+        return self._only
+
+    @only.setter
+    def only(self, value):
+        if value is not None:
+            if isinstance(value, str):
+                value = (value,)
+            value = tuple(value)
+            for name in value:
+                if name not in self.fields:
+                    raise ValueError("only must name fields of the report: " \
+                        + ", ".join(self.fields))
+        self._only = value
+
     @property
     def soup(self):
         return self._soup
 
     @soup.setter
     def soup(self, value):
-        if value is not None and not isinstance(value, BeautifulSoup):
-            raise TypeError("soup must be of type BeautifulSoup")
+        if value is not None:
+            from bs4 import BeautifulSoup
+            if not isinstance(value, BeautifulSoup):
+                raise TypeError("soup must be of type BeautifulSoup")
         self._soup = value
+        self.__index = None
+
+    def __match(self, tag, attrs):
+        # Same rules as find_all: multi-valued attributes such as class match
+        # on any single value or on the whole attribute string
+        for key, value in attrs:
+            actual = tag.get(key)
+            if actual is None:
+                return False
+            if isinstance(actual, list):
+                if value not in actual and value != " ".join(actual):
+                    return False
+            elif actual != value:
+                return False
+        return True
+
+    def _find_all(self, name, attrs = None):
+        """
+        Indexed replacement for soup.find_all(name, attrs). The document is
+        walked once, the first time any lookup is made, and each tag/attribute
+        signature is matched once and remembered until the soup is replaced.
+        """
+        if self.__index is None:
+            self.__index = {}
+            for tag in self.soup.find_all(True):
+                self.__index.setdefault(tag.name, []).append(tag)
+        attrs = tuple(sorted((attrs or {}).items()))
+        key = (name, attrs)
+        if key not in self.__index:
+            self.__index[key] = [tag for tag in self.__index.get(name, []) \
+                if self.__match(tag, attrs)]
+        return self.__index[key]
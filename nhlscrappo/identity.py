@@ -0,0 +1,83 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Interned identities of the people named in reports"""
+
+import threading
+from nhlscrappo.records import plain
+
+class Registry(object):
+    """
+    Interns the players, coaches and officials named in reports to compact
+    integer IDs, shared by every parser given the registry. Parsers key their
+    output by ID instead of by name, so each name is stored once however
+    many reports mention it and joins across reports compare integers. A
+    person is identified by their name and team, so namesakes on different
+    teams get different IDs; officials have no team. Rosters also record the
+    ID behind every (team, jersey) pair. Names are stored as plain strings,
+    so the registry never keeps a parsed document alive.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__ids = {}
+        self.__people = []
+        self.__jerseys = {}
+
+    def id(self, name, team = None):
+        """
+        Return the ID of name playing for team, assigning the next one if
+        they are new
+        """
+        try:
+            return self.__ids[(name, team)]
+        except KeyError:
+            pass
+        key = (plain(name), None if team is None else plain(team))
+        with self.__lock:
+            if key not in self.__ids:
+                self.__ids[key] = len(self.__people)
+                self.__people.append(key)
+            return self.__ids[key]
+
+    def name(self, person):
+        """Return the name behind the ID person"""
+        return self.__people[person][0]
+
+    def team(self, person):
+        """Return the team of the ID person, None for officials"""
+        return self.__people[person][1]
+
+    def add_jersey(self, team, number, person):
+        """Record that person wears number for team"""
+        with self.__lock:
+            self.__jerseys[(plain(team), int(number))] = plain(person)
+
+    def jersey(self, team, number):
+        """Return the ID of whoever wears number for team, or None"""
+        return self.__jerseys.get((team, int(number)))
+
+    def __contains__(self, person):
+        """Whether the (name, team) pair person has an ID"""
+        return person in self.__ids
+
+    def __len__(self):
+        return len(self.__people)
@@ -0,0 +1,104 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Join play-by-play events with time-on-ice shifts. Requires numpy."""
+
+import numpy as np
+from nhlscrappo import PlayType
+from nhlscrappo.records import Play
+from nhlscrappo.shifts import ShiftIndex
+
+_STARTS_SHIFT = (PlayType.Faceoff, PlayType.PeriodStart)
+
+def _masks(owner, jerseys, rows):
+    """OR jerseys 0-127 into a pair of 64 bit masks per owner row"""
+    masks = np.zeros((rows, 2), dtype = np.uint64)
+    keep = jerseys >= 0
+    owner, jerseys = owner[keep], jerseys[keep].astype(np.uint64)
+    bits = np.left_shift(np.uint64(1), jerseys % np.uint64(64))
+    np.bitwise_or.at(masks, (owner, (jerseys // np.uint64(64)).astype( \
+        np.intp)), bits)
+    return masks
+
+class PlayShiftJoin(object):
+    """
+    Attribute every play of a game to the players on the ice, using the home
+    and away TOIParser reports. All plays are looked up in one vectorized
+    pass over a ShiftIndex.
+
+    Faceoffs and period starts see the players whose shift begins at that
+    instant; every other event sees the players whose shift ends at it.
+    """
+
+    def __init__(self, plays, home, away):
+        self.plays = [p if isinstance(p, Play) else Play.from_list(p) \
+            for p in plays]
+        self.index = index = ShiftIndex(home, away)
+        n = len(self.plays)
+
+        period = np.fromiter((p.period for p in self.plays), np.int32, n)
+        elapsed = np.fromiter((p.elapsed for p in self.plays), np.int32, n)
+        starts = np.fromiter((p.event in _STARTS_SHIFT \
+            for p in self.plays), bool, n)
+        self.segments = np.where(starts, \
+            index.segments(period, elapsed, "left"), \
+            index.segments(period, elapsed, "right"))
+        """ShiftIndex segment of each play, -1 if nobody was on the ice"""
+
+        # Jerseys on the ice per segment according to the shift reports. Row
+        # -1 (the extra last row) is left empty for plays outside any shift.
+        segs = len(index.offsets)
+        owner = np.repeat(np.arange(segs - 1), np.diff(index.offsets))
+        shift_team = index.team[index.members]
+        shift_jersey = index.jerseys[index.player[index.members]]
+        toi = {}
+        for side, code in (("home", ShiftIndex.HOME), \
+            ("away", ShiftIndex.AWAY)):
+            mine = shift_team == code
+            toi[side] = _masks(owner[mine], shift_jersey[mine], segs)
+
+        self.home_mismatch = None
+        """Plays whose home on-ice jerseys disagree with the shifts"""
+        self.away_mismatch = None
+        """Plays whose away on-ice jerseys disagree with the shifts"""
+        for side in ("home", "away"):
+            on_ice = [getattr(p, side + "_on_ice") for p in self.plays]
+            lengths = np.fromiter((len(o) for o in on_ice), np.int64, n)
+            flat = np.frombuffer(b"".join(o.tobytes() for o in on_ice), \
+                dtype = np.uint8).astype(np.int16)
+            play_masks = _masks(np.repeat(np.arange(n), lengths), flat, n)
+            # Plays that list nobody (period starts, stoppages) can't disagree
+            listed = lengths > 0
+            differs = np.any(play_masks != toi[side][self.segments], axis = 1)
+            setattr(self, side + "_mismatch", differs & listed)
+
+    def names(self, i):
+        """Players on the ice for play i as {"home": [...], "away": [...]}"""
+        shifts = self.index.shifts_at(int(self.segments[i]))
+        team = self.index.team[shifts]
+        player = self.index.player[shifts]
+        return {"home": list(self.index.names[player[team == \
+            ShiftIndex.HOME]]), "away": list(self.index.names[player[team == \
+            ShiftIndex.AWAY]])}
+
+    def __iter__(self):
+        """Yield (play, names) for every play"""
+        for i, play in enumerate(self.plays):
+            yield play, self.names(i)
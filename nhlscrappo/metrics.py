@@ -0,0 +1,114 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Per-stage instrumentation of fetching and parsing"""
+
+import contextlib
+import functools
+import threading
+import time
+
+STAGES = ("network", "tree", "extract")
+"""Timed stages of every report"""
+
+COUNTERS = ("bytes", "cache_hit", "cache_miss", "not_modified", "rows")
+"""Counted quantities of every report"""
+
+class Metrics(object):
+    """
+    Collects stage durations (seconds) and counters for every report handled
+    by a ReportFetcher it is given to. Totals are kept per report type; each
+    observation is also passed to every sink as sink(report, name, value).
+    Fetchers without metrics skip all of this.
+    """
+
+    def __init__(self, sinks = ()):
+        self.sinks = list(sinks)
+        self.__lock = threading.Lock()
+        self.__totals = {}
+
+    @contextlib.contextmanager
+    def timer(self, report, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(report, stage, time.perf_counter() - start)
+
+    def record(self, report, name, value):
+        key = report.report_type.name
+        with self.__lock:
+            totals = self.__totals.setdefault(key, {})
+            total = totals.setdefault(name, {"count": 0, "sum": 0, \
+                "max": 0})
+            total["count"] += 1
+            total["sum"] += value
+            total["max"] = max(total["max"], value)
+        for sink in self.sinks:
+            sink(report, name, value)
+
+    def snapshot(self):
+        """Return {report type: {name: {"count", "sum", "max"}}}"""
+        with self.__lock:
+            return {key: {name: dict(total) for name, total \
+                in totals.items()} for key, totals in self.__totals.items()}
+
+    def reset(self):
+        with self.__lock:
+            self.__totals = {}
+
+class StatsdSink(object):
+    """
+    Forward observations to a statsd daemon over UDP, as timers for stages
+    (in milliseconds) and counters otherwise, named
+    prefix.<report type>.<name>
+    """
+
+    def __init__(self, host = "127.0.0.1", port = 8125, prefix = "nhlscrappo"):
+        import socket
+        self.address = (host, port)
+        self.prefix = prefix
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, report, name, value):
+        metric = "%s.%s.%s" % (self.prefix, report.report_type.name, name)
+        if name in STAGES:
+            line = "%s:%.3f|ms" % (metric, value * 1000)
+        else:
+            line = "%s:%i|c" % (metric, value)
+        try:
+            self.__socket.sendto(line.encode("ascii"), self.address)
+        except OSError:
+            # Dashboards are best effort; never fail a scrape over them
+            pass
+
+def extraction(method):
+    """Time a load_* method and count the rows it extracts"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.metrics is None:
+            return method(self, *args, **kwargs)
+        rows = self.row_count()
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        self.metrics.record(self, "extract", time.perf_counter() - start)
+        self.metrics.record(self, "rows", self.row_count() - rows)
+        return result
+    return wrapper
@@ -20,13 +20,54 @@
 
 from nhlscrappo import ReportType
 from nhlscrappo.fetcher import ReportFetcher
+from nhlscrappo.metrics import extraction
+from nhlscrappo.records import Play
+
+def _string(el):
+    """Equivalent of BeautifulSoup's Tag.string for an lxml element"""
+    while True:
+        if len(el) == 0:
+            return el.text
+        if len(el) > 1 or el.text or el[0].tail:
+            return None
+        el = el[0]
+
+class _XPath(object):
+    """XPath expression compiled on first use, so lxml loads only if needed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.__compiled = None
+
+    def __call__(self, node):
+        if self.__compiled is None:
+            from lxml import etree
+            self.__compiled = etree.XPath(self.path)
+        return self.__compiled(node)
+
+def _strainer(name, attrs = None):
+    """SoupStrainer for name and attrs, importing BeautifulSoup on demand"""
+    from bs4 import SoupStrainer
+    return SoupStrainer(name, attrs or {})
+
+def _has_class(name):
+    """
+    Strainer value matching elements with the CSS class name. Classes are
+    not split yet while the document is being built, so a plain string would
+    only match the whole attribute.
+    """
+    import re
+    return re.compile(r"(^|\s)%s(\s|$)" % name)
 
 class RosterParser(ReportFetcher):
     """Parse the roster report and fill appropriate fields"""
 
-    def __init__(self, season, game_num, game_type):
+    fields = ("teams", "rosters", "scratches", "coaches", \
+        "officials")
+
+    def __init__(self, season, game_num, game_type, **kwargs):
         super(RosterParser, self).__init__(season, game_num, game_type, \
-            ReportType.Roster)
+            ReportType.Roster, **kwargs)
 
         self.teams = {}
         """Home and away teams {home: team name, away: team name}"""
@@ -43,7 +84,7 @@ class RosterParser(ReportFetcher):
         self.officials = {"refs": {}, "linesmen": {}}
         """Game officials {"refs/linesmen": {number: name}}"""
 
-    def __fill_roster_entity(self, td, players):
+    def __fill_roster_entity(self, td, players, team):
         tr = td.find_all("tr")
         for data in tr:
             td = data.find_all("td")
@@ -52,36 +93,63 @@ class RosterParser(ReportFetcher):
                 stats = {"num":li[0], "pos":li[1]}
                 # Remove Captain (C) and Assistant (A) adornments
                 name = li[2].split("(")[0].rstrip()
-                players[name] = stats
+                players[self._person(name, team)] = stats
 
+    @extraction
     def load_teams(self):
-        teamHeading = self.soup.find_all("td", {"class":"teamHeading"})
+        teamHeading = self._find_all("td", {"class":"teamHeading"})
         self.teams["away"] = teamHeading[0].string
         self.teams["home"] = teamHeading[1].string
 
+    def __team_names(self):
+        # Players are identified within their team, as are jersey numbers
+        if self.registry is not None and not self.teams:
+            self.load_teams()
+        return self.teams
+
+    @extraction
     def load_players(self):
+        td = self._find_all("td", {"width":"50%"})
+        teams = self.__team_names()
         # The visitor team player table is the third table
-        td = [data for data in self.soup.find_all("td", {"width":"50%"})][2]
-        self.__fill_roster_entity(td, self.rosters["away"])
+        self.__fill_roster_entity(td[2], self.rosters["away"], \
+            teams.get("away"))
         # The home team player table is the fourth table
-        td = [data for data in self.soup.find_all("td", {"width":"50%"})][3]
-        self.__fill_roster_entity(td, self.rosters["home"])
+        self.__fill_roster_entity(td[3], self.rosters["home"], \
+            teams.get("home"))
+        self.__register_jerseys(self.rosters)
 
+    @extraction
     def load_scratches(self):
+        td = self._find_all("td", {"width":"50%"})
+        teams = self.__team_names()
         # The visitor scratch table is the fifth table
-        td = [data for data in self.soup.find_all("td", {"width":"50%"})][4]
-        self.__fill_roster_entity(td, self.scratches["away"])
+        self.__fill_roster_entity(td[4], self.scratches["away"], \
+            teams.get("away"))
         # The home scratch table is the sixth table
-        td = [data for data in self.soup.find_all("td", {"width":"50%"})][5]
-        self.__fill_roster_entity(td, self.scratches["home"])
-
+        self.__fill_roster_entity(td[5], self.scratches["home"], \
+            teams.get("home"))
+        self.__register_jerseys(self.scratches)
+
+    def __register_jerseys(self, sides):
+        if self.registry is None:
+            return
+        for side, players in sides.items():
+            for person, stats in players.items():
+                if stats["num"] and stats["num"].isdigit():
+                    self.registry.add_jersey(self.teams[side], stats["num"], \
+                        person)
+
+    @extraction
     def load_coaches(self):
-        td = [data for data in self.soup.find_all("td", {"width":"50%"})]
+        td = self._find_all("td", {"width":"50%"})
+        teams = self.__team_names()
         # The coaches tables are the seventh and eighth tables
         for i, cell in enumerate(td[6:8]):
             keys = ["away", "home"]
             tr = cell.find_all("tr")
-            self.coaches[keys[i]] = tr[0].find("td").string
+            self.coaches[keys[i]] = self._person(tr[0].find("td").string, \
+                teams.get(keys[i]))
 
     def __get_num(self, s):
         s = s.replace("#", "").strip()
@@ -104,11 +172,12 @@ class RosterParser(ReportFetcher):
             num, name = self.__num_name(oi)
             if num in d:
                 num = max(d.keys() + 1)
-            d[num] = name
+            d[num] = self._person(name)
         return d
 
+    @extraction
     def load_officials(self):
-        td = [data for data in self.soup.find_all("td", {"width":"100%"})]
+        td = self._find_all("td", {"width":"100%"})
         tr = [cell for cell in td[2].find_all("tr", {"valign":"top","id":""})]
         ltd = [cell for cell in tr[0].find_all("td", {"align":"left"})]
         referees = [ref.string for ref in ltd[0].find_all("td")]
@@ -125,17 +194,48 @@ class RosterParser(ReportFetcher):
             linesmen = [ltd[5].string, ltd[6].string]
             self.officials["linesmen"] = self.__make_dict(linesmen)
 
+    def row_count(self):
+        return sum(len(team) for team in self.rosters.values()) + \
+            sum(len(team) for team in self.scratches.values())
+
+    def strainer(self):
+        if self.only is None:
+            return None
+        if set(self.only) == {"teams"}:
+            return _strainer("td", {"class":_has_class("teamHeading")})
+        if self._wants("teams") or self._wants("officials"):
+            return _strainer("td", {"width":["50%", "100%"]})
+        return _strainer("td", {"width":"50%"})
+
+    def load_all(self):
+        if self._wants("teams"):
+            self.load_teams()
+        if self._wants("rosters"):
+            self.load_players()
+        if self._wants("scratches"):
+            self.load_scratches()
+        if self._wants("coaches"):
+            self.load_coaches()
+        if self._wants("officials"):
+            self.load_officials()
+
 class ShotParser(ReportFetcher):
     """Parse the shot summary report and fill appropriate fields"""
 
-    def __init__(self, season, game_num, game_type):
+    fields = ("shots",)
+
+    def __init__(self, season, game_num, game_type, numeric = False, \
+        **kwargs):
         super(ShotParser, self).__init__(season, game_num, game_type, \
-            ReportType.Shots)
+            ReportType.Shots, **kwargs)
+        self.numeric = numeric
+        """Produce TeamShots arrays rather than dicts of strings"""
 
         self.shots = {"away": {}, "home": {}}
         """
         Player shot summary statistics
         {"home/away": {name: {period: [EV, PP, SH, TOT]}}}
+        or {"home/away": TeamShots} when numeric is set
         """
 
     def __make_list(self, i):
@@ -163,60 +263,69 @@ class ShotParser(ReportFetcher):
             summary[int(split[0])] = split[1]
         return summary
 
-    def __fill_shots_entity(self, table):
+    def __fill_shots_entity(self, table, team):
         player_names = []
         player_stats = []
         pstat = []
 
         tr = [cell for cell in table[3].find_all("tr")]
-        # The first list we generate is for the player names
         for i in tr:
+            # Rows without attributes carry the player names
             if not i.attrs:
                 ptd = [cell for cell \
                     in i.find_all("td", {"align":"center", "class":""})]
                 if len(ptd) > 2:
                     name = " ".join([ptd[1].string, ptd[2].string])
-                    player_names.append(name)
-        # The second list we generate is for the player statistics
-        for i in tr:
+                    player_names.append(self._person(name, team))
+            # Nested coloured rows carry the player statistics
             evenColor = [cell for cell \
                 in i.find_all("tr", {"class":"evenColor"})]
             oddColor = [cell for cell \
                 in i.find_all("tr", {"class":"oddColor"})]
-            if oddColor:
-                for line in oddColor:
-                    p = self.__make_list(line)
-                    if p is not None:
-                        pstat.append(p)
-                    else:
-                        player_stats.append(self.__period_dict(pstat))
-                        pstat = []
-            if evenColor:
-                for line in evenColor:
-                    p = self.__make_list(line)
-                    if p is not None:
-                        pstat.append(p)
-                    else:
-                        player_stats.append(self.__period_dict(pstat))
-                        pstat = []
+            for line in oddColor + evenColor:
+                p = self.__make_list(line)
+                if p is not None:
+                    pstat.append(p)
+                else:
+                    player_stats.append(self.__period_dict(pstat))
+                    pstat = []
         # Zip the two lists together into a dictionary
         return dict(zip(player_names, player_stats))
 
+    @extraction
     def load_shots(self):
-        td = [data for data in self.soup.find_all("td", {"width":"50%"})]
+        td = self._find_all("td", {"width":"50%"})
         # 4 is visitor, 5 is home
-        table = [cell for cell in td[4].find_all("table")]
-        self.shots["away"] = self.__fill_shots_entity(table)
-        table = [cell for cell in td[5].find_all("table")]
-        self.shots["home"] = self.__fill_shots_entity(table)
+        for side, cell in (("away", td[4]), ("home", td[5])):
+            table = [t for t in cell.find_all("table")]
+            team = cell.find("td", {"class":"teamHeading"})
+            self.shots[side] = self.__fill_shots_entity(table, \
+                team.string if team is not None else None)
+        if self.numeric:
+            from nhlscrappo.shots import from_shots
+            self.shots = from_shots(self.shots)
+
+    def row_count(self):
+        return sum(len(team) for team in self.shots.values())
+
+    def strainer(self):
+        if self.only is None:
+            return None
+        return _strainer("td", {"width":"50%"})
+
+    def load_all(self):
+        if self._wants("shots"):
+            self.load_shots()
 
 
 class TOIParser(ReportFetcher):
     """Parse the time-on-ice data and fill appropriate fields"""
 
-    def __init__(self, season, game_num, game_type, report_type):
+    fields = ("players", "numbers")
+
+    def __init__(self, season, game_num, game_type, report_type, **kwargs):
         super(TOIParser, self).__init__(season, game_num, game_type, \
-            report_type)
+            report_type, **kwargs)
 
         self.players = {}
         """
@@ -224,16 +333,26 @@ class TOIParser(ReportFetcher):
         {name: {period: [shift, start of shift, end of shift, event]}}
         """
 
+        self.numbers = {}
+        """Player jersey numbers {name: number}"""
+
+    @extraction
     def load_players(self):
         players = []
         borders = []
+        team = None
         # The first list we generate is for the player names
         td = [cell for cell in self.soup("td")]
         for i in td:
+            # The team heading precedes every player
+            if i.has_attr("class") and i["class"][0] == "teamHeading" and \
+                team is None:
+                team = i.string
             if i.has_attr("class") and i["class"][0] == "playerHeading":
-                player_name = i.string.split(" ")[2] + " " + \
-                    i.string.split(" ")[1][:-1]
+                player_name = self._person(i.string.split(" ")[2] + " " + \
+                    i.string.split(" ")[1][:-1], team)
                 players.append(player_name)
+                self.numbers[player_name] = i.string.split(" ")[0]
             if i.has_attr("class") and i["class"][0] == "lborder" \
                 and i["class"][2] == "bborder":
                 borders.append(i.string)
@@ -254,26 +373,42 @@ class TOIParser(ReportFetcher):
                 shift = 0
             x += 6
 
+    def row_count(self):
+        return sum(len(shifts) for periods in self.players.values() \
+            for shifts in periods.values())
+
+    def strainer(self):
+        if self.only is None:
+            return None
+        return _strainer("td")
+
+    def load_all(self):
+        # Names, jerseys and shifts all come out of the same pass
+        if self._wants("players") or self._wants("numbers"):
+            self.load_players()
+
 class HomeTOIParser(TOIParser):
     """Wrapper for TOIParser for the home team"""
 
-    def __init__(self, season, game_num, game_type):
+    def __init__(self, season, game_num, game_type, **kwargs):
         super(HomeTOIParser, self).__init__(season, game_num, game_type, \
-            ReportType.HomeTOI)
+            ReportType.HomeTOI, **kwargs)
 
 class AwayTOIParser(TOIParser):
     """Wrapper for TOIParser for the away team"""
 
-    def __init__(self, season, game_num, game_type):
+    def __init__(self, season, game_num, game_type, **kwargs):
         super(AwayTOIParser, self).__init__(season, game_num, game_type, \
-            ReportType.AwayTOI)
+            ReportType.AwayTOI, **kwargs)
 
 class EventParser(ReportFetcher):
     """Parse the events summary report and fill appropriate fields"""
 
-    def __init__(self, season, game_num, game_type):
+    fields = ("events",)
+
+    def __init__(self, season, game_num, game_type, **kwargs):
         super(EventParser, self).__init__(season, game_num, game_type, \
-            ReportType.Events)
+            ReportType.Events, **kwargs)
 
         self.events = {}
         """
@@ -282,15 +417,15 @@ class EventParser(ReportFetcher):
              BS, FW, FL]}}
         """
 
-    def __fill_players_entity(self, n, tr):
+    def __fill_players_entity(self, n, tr, team):
         p = 0
         players_dict = {}
         player_list = []
         # Twenty players on a team
         while p < 20:
             td = [data for data in tr[n+p].find_all("td")]
-            player_name = td[2].string.split(" ")[1] + " " + \
-                td[2].string.split(" ")[0][:-1]
+            player_name = self._person(td[2].string.split(" ")[1] + " " + \
+                td[2].string.split(" ")[0][:-1], team)
             # Grab the first 6 values
             for i in td[3:9]:
                 player_list.append(i.string.replace(u"\xa0", u" "))
@@ -303,28 +438,62 @@ class EventParser(ReportFetcher):
         return players_dict
 
 
+    @extraction
     def load_events(self):
         tr = [cell for cell in self.soup("tr")]
+        # The away and home section headings name the teams
+        teams = [cell.string for cell in self.soup("td", {"class": \
+            ["visitorsectionheading", "homesectionheading"]})] + [None, None]
         for x, i in enumerate(tr):
             if i.has_attr("class") and "evenColor" in i["class"]:
-               away = self.__fill_players_entity(x, tr)
+               away = self.__fill_players_entity(x, tr, teams[0])
                break
-        home = self.__fill_players_entity(x+25, tr)
+        home = self.__fill_players_entity(x+25, tr, teams[1])
         self.events["home"] = home
         self.events["away"] = away
 
+    def row_count(self):
+        return sum(len(team) for team in self.events.values())
+
+    def strainer(self):
+        if self.only is None:
+            return None
+        return _strainer("tr")
+
+    def load_all(self):
+        if self._wants("events"):
+            self.load_events()
+
 class PlayParser(ReportFetcher):
     """Parse the play-by-play report for the game"""
 
-    def __init__(self, season, game_num, game_type):
+    backends = ("soup", "lxml")
+
+    fields = ("plays",)
+
+    __rows = _XPath("//tr[contains(concat(' ', normalize-space(@class)," \
+        " ' '), ' evenColor ')]")
+    __cells = _XPath(".//td")
+    __centered = _XPath(".//td[@align='center']")
+    __font = _XPath(".//font")
+
+    def __init__(self, season, game_num, game_type, records = False, \
+        events = None, **kwargs):
         super(PlayParser, self).__init__(season, game_num, game_type, \
-            ReportType.Plays)
+            ReportType.Plays, **kwargs)
+        self.records = records
+        """Produce typed Play records rather than lists"""
+
+        self.events = events
+        """Event codes (e.g. GOAL, SHOT) to extract, or None for every play"""
+
         self.plays = []
         """
         Play-by-play data
         [event number, period, strength, elapsed time, event code, \
          description, [[visitor jersey number, visitor position]], \
          [[home jersey number, home jersey position]]]
+        or Play records when records is set
         """
 
     def __fill_on_ice(self, td):
@@ -336,10 +505,71 @@ class PlayParser(ReportFetcher):
                 on_ice.append([centwo[0].find("font").string, centwo[1].string])
         return on_ice
 
+    def __fill_on_ice_tree(self, td):
+        on_ice = []
+        for h, i in enumerate(self.__centered(td)):
+            if h % 4 == 0:
+                centwo = self.__cells(i)
+                on_ice.append([_string(self.__font(centwo[0])[0]), \
+                    _string(centwo[1])])
+        return on_ice
+
+    def __wanted(self, code):
+        return self.events is None or code in self.events
+
+    def __play_from_cells(self, cells):
+        play = []
+        for j, k in enumerate(cells):
+            classes = k.get("class", "").split()
+            if len(classes) > 2 and classes[2] == "bborder":
+                # if j == 3 then process the elapsed time
+                if j == 3:
+                    play.append(k.text)
+                string = _string(k)
+                if string is not None:
+                    play.append(string.replace(u"\xa0", u" "))
+                if j == 6 or j == 30:
+                    play.append(self.__fill_on_ice_tree(k))
+        return Play.from_list(play) if self.records else play
+
+    def __load_plays_tree(self):
+        for row in self.__rows(self.tree):
+            cells = self.__cells(row)
+            if self.__wanted(_string(cells[4])):
+                self.plays.append(self.__play_from_cells(cells))
+
+    def iter_plays(self, local = None):
+        """
+        Yield each play as soon as its row has been parsed. The report is
+        parsed incrementally and rows are freed once yielded, so neither a
+        soup nor a full tree is ever held in memory. self.plays is left
+        untouched.
+        """
+        from lxml import etree
+        with self._open_raw(local) as handle:
+            for event, row in etree.iterparse(handle, events = ("end",), \
+                tag = "tr", html = True):
+                if "evenColor" not in row.get("class", "").split():
+                    continue
+                cells = self.__cells(row)
+                if self.__wanted(_string(cells[4])):
+                    yield self.__play_from_cells(cells)
+                # Drop the row and everything parsed before it
+                row.clear()
+                parent = row.getparent()
+                while row.getprevious() is not None:
+                    del parent[0]
+
+    @extraction
     def load_plays(self):
+        if self.backend == "lxml":
+            self.__load_plays_tree()
+            return
         evenColor = [data for data in self.soup.find_all("tr", {"class":"evenColor"})]
         for h, i in enumerate(evenColor):
             td = [cell for cell in i.find_all("td")]
+            if not self.__wanted(td[4].string):
+                continue
             play = []
             for j, k in enumerate(td):
                 if k.has_attr("class") and k["class"][2] == "bborder":
@@ -350,4 +580,40 @@ class PlayParser(ReportFetcher):
                         play.append(k.string.replace(u"\xa0", u" "))
                     if j == 6 or j == 30:
                         play.append(self.__fill_on_ice(k))
-            self.plays.append(play)
+            self.plays.append(Play.from_list(play) if self.records else play)
+
+    def strainer(self):
+        if self.only is None and self.events is None:
+            return None
+        return _strainer("tr", {"class":_has_class("evenColor")})
+
+    def row_count(self):
+        return len(self.plays)
+
+    def load_all(self):
+        if self._wants("plays"):
+            self.load_plays()
+
+    @property
+    def events(self):
+        return self._events
+
+    @events.setter
+    def events(self, value):
+        if value is not None:
+            if isinstance(value, str):
+                value = (value,)
+            value = frozenset(value)
+            if not all(isinstance(code, str) for code in value):
+                raise TypeError("events must be of type str")
+        self._events = value
+
+PARSERS = {
+    ReportType.Roster: RosterParser,
+    ReportType.Shots: ShotParser,
+    ReportType.HomeTOI: HomeTOIParser,
+    ReportType.AwayTOI: AwayTOIParser,
+    ReportType.Events: EventParser,
+    ReportType.Plays: PlayParser
+}
+"""Parser class for each report type that has one"""
@@ -0,0 +1,114 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Parsing of raw reports in a pool of worker processes"""
+
+from nhlscrappo.bulk import BulkFetcher, check_report_options, make_report
+
+def parse_report(season, game_num, game_type, report_type, raw, \
+    backend = None, report_options = None, **options):
+    """
+    Parse raw with the parser for report_type and return a ReportResult.
+    backend is used if the parser supports it; options, and the
+    report_options of report_type, are passed on to the parser.
+    """
+    report = make_report(season, game_num, game_type, report_type, \
+        report_options, **options)
+    if backend in report.backends:
+        report.backend = backend
+    report.parse(raw)
+    report.load_all()
+    return report.result()
+
+class ParsePool(object):
+    """
+    Pool of processes that build the document tree and extract the fields of
+    raw reports. Only the raw bytes are sent to a worker and only the
+    extracted fields come back, so neither side pickles a tree. processes
+    defaults to the number of CPUs. Extra keyword arguments are passed on to
+    every parser and report_options maps a ReportType to the options of its
+    parser alone, e.g. {ReportType.Plays: {"only": ("plays",)}}.
+    """
+
+    def __init__(self, processes = None, backend = "lxml", \
+        report_options = None, **options):
+        from concurrent.futures import ProcessPoolExecutor
+        self.backend = backend
+        self.report_options = check_report_options(report_options)
+        self.options = options
+        self.__executor = ProcessPoolExecutor(max_workers = processes)
+
+    def submit(self, report, raw):
+        """Schedule raw, the body of report, and return a Future"""
+        return self.__executor.submit(parse_report, report.season, \
+            report.game_num, report.game_type, report.report_type, raw, \
+            self.backend, self.report_options, **self.options)
+
+    def parse(self, report, raw):
+        """Parse raw, the body of report, and wait for its ReportResult"""
+        return self.submit(report, raw).result()
+
+    def close(self):
+        self.__executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        if not isinstance(value, str):
+            raise TypeError("backend must be of type str")
+        self._backend = value
+
+class PoolFetcher(BulkFetcher):
+    """
+    BulkFetcher that downloads in threads and parses in the processes of
+    pool. Results carry a ReportResult instead of a parser. Extraction time
+    is spent in the workers, so metrics only cover the network stage.
+    """
+
+    def __init__(self, pool, *args, **kwargs):
+        # Only extracted fields come back from the pool
+        kwargs.setdefault("results_only", True)
+        super(PoolFetcher, self).__init__(*args, **kwargs)
+        self.pool = pool
+
+    def _load(self, report):
+        with report._open_raw() as handle:
+            raw = handle.read()
+        return self.pool.parse(report, raw)
+
+    @property
+    def pool(self):
+        return self._pool
+
+    @pool.setter
+    def pool(self, value):
+        if not isinstance(value, ParsePool):
+            raise TypeError("pool must be of type ParsePool")
+        self._pool = value
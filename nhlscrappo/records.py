@@ -0,0 +1,139 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Compact typed records for parsed report data"""
+
+from array import array
+from nhlscrappo import PlayType, PlayerStrength
+
+_PLAY_TYPES = {t.value: t for t in PlayType}
+_STRENGTHS = {s.value: s for s in PlayerStrength}
+
+def to_seconds(clock):
+    """Convert a "M:SS" clock reading to integer seconds"""
+    minutes, seconds = clock.strip().split(":")
+    return int(minutes) * 60 + int(seconds)
+
+def to_clock(seconds):
+    """Convert integer seconds to a "M:SS" clock reading"""
+    return "%d:%02d" % divmod(seconds, 60)
+
+class Play(object):
+    """
+    A single play-by-play event. event is a PlayType, or the raw event code
+    for codes PlayType does not know; strength is a PlayerStrength or None.
+    Jersey numbers on the ice are held in byte arrays, with the matching
+    positions as a string of one letter per player.
+    """
+
+    __slots__ = ("number", "period", "strength", "elapsed", "event", \
+        "description", "away_on_ice", "away_positions", "home_on_ice", \
+        "home_positions")
+
+    def __init__(self, number, period, strength, elapsed, event, \
+        description, away_on_ice = (), away_positions = "", \
+        home_on_ice = (), home_positions = ""):
+        self.number = number
+        self.period = period
+        self.strength = strength
+        self.elapsed = elapsed
+        self.event = event
+        self.description = description
+        self.away_on_ice = array("B", away_on_ice)
+        self.away_positions = away_positions
+        self.home_on_ice = array("B", home_on_ice)
+        self.home_positions = home_positions
+
+    @classmethod
+    def from_list(cls, play):
+        """Build a Play from a PlayParser list"""
+        strength = play[2].strip()
+        event = play[4].strip()
+        # The description is missing when its cell holds more than a string
+        # (e.g. a line break before the assists on a goal)
+        rest = play[5:]
+        description = ""
+        if rest and isinstance(rest[0], str):
+            description = rest[0].strip()
+        on_ice = [p for p in rest if isinstance(p, list)] + [[], []]
+        away, home = on_ice[0], on_ice[1]
+        return cls(int(play[0]), int(play[1]), _STRENGTHS.get(strength), \
+            to_seconds(play[3]), _PLAY_TYPES.get(event, event), description, \
+            [int(p[0]) for p in away], "".join(p[1] for p in away), \
+            [int(p[0]) for p in home], "".join(p[1] for p in home))
+
+    def as_list(self):
+        """
+        View the play in the PlayParser list format. Cells that the list
+        format fills with placeholders (empty on-ice groups, blank strength)
+        come back normalized.
+        """
+        event = self.event.value if isinstance(self.event, PlayType) \
+            else self.event
+        return [str(self.number), str(self.period), \
+            self.strength.value if self.strength is not None else " ", \
+            to_clock(self.elapsed), event, self.description, \
+            [[str(n), p] for n, p in zip(self.away_on_ice, \
+                self.away_positions)], \
+            [[str(n), p] for n, p in zip(self.home_on_ice, \
+                self.home_positions)]]
+
+    def __eq__(self, other):
+        if not isinstance(other, Play):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) \
+            for f in self.__slots__)
+
+    def __repr__(self):
+        return "Play(%i, period %i, %s, %s)" % (self.number, self.period, \
+            to_clock(self.elapsed), self.as_list()[4])
+
+def plain(value):
+    """
+    Copy extracted data into plain Python types. Strings that come out of a
+    soup keep a reference to their tree, so they are converted to str.
+    """
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, dict):
+        return {plain(k): plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [plain(v) for v in value]
+    return value
+
+class ReportResult(object):
+    """
+    The extracted fields of a parsed report without its document. Fields
+    are available under the same attribute names as on the parser, e.g.
+    result.plays or result.rosters.
+    """
+
+    def __init__(self, season, game_num, game_type, report_type, fields):
+        self.season = season
+        self.game_num = game_num
+        self.game_type = game_type
+        self.report_type = report_type
+        self.fields = tuple(fields)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return "ReportResult(%i, %i, %s, %s)" % (self.season, self.game_num, \
+            self.game_type.name, self.report_type.name)
@@ -0,0 +1,218 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Rate limiting, retries and adaptive concurrency for requests"""
+
+import threading
+import time
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+"""Response statuses that are retried"""
+
+OVERLOAD_STATUSES = (429, 503)
+"""Retried statuses that also mean the server wants us to slow down"""
+
+class RequestScheduler(object):
+    """
+    Shared gate for every request of a run.
+
+    Requests draw from a token bucket refilled at rate per second, holding
+    at most burst tokens. Throttled or failed attempts (a status in
+    RETRY_STATUSES, a timeout or a dropped connection) are retried up to
+    max_retries times. The wait is exponential backoff with full jitter, or
+    the server's Retry-After if it sends one.
+
+    Concurrency and rate adapt additively/multiplicatively: every success
+    raises the rate by rate_step (up to max_rate) and every success_window
+    consecutive successes allow one more request in flight (up to
+    max_concurrency). Overload (a status in OVERLOAD_STATUSES, a timeout or a
+    dropped connection) halves both, down to one request at min_rate;
+    overloads within cooldown seconds of the last cut count as one event.
+    """
+
+    def __init__(self, rate = 5.0, burst = 5, max_retries = 5, \
+        backoff = 0.5, max_backoff = 60.0, concurrency = 4, \
+        max_concurrency = 16, max_rate = 50.0, min_rate = 0.1, \
+        rate_step = 0.2, success_window = 20, cooldown = 1.0, \
+        clock = time.monotonic, sleep = time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate_step = rate_step
+        self.success_window = success_window
+        self.cooldown = cooldown
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__tokens = float(burst)
+        self.__stamp = clock()
+        self.__in_flight = 0
+        self.__streak = 0
+        self.__last_cut = None
+        self.__lock = threading.Lock()
+        self.__slot = threading.Condition(self.__lock)
+
+    def __take_token(self):
+        while True:
+            with self.__lock:
+                now = self.__clock()
+                self.__tokens = min(self.burst, self.__tokens + \
+                    (now - self.__stamp) * self.rate)
+                self.__stamp = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait = (1 - self.__tokens) / self.rate
+            self.__sleep(wait)
+
+    def __enter_slot(self):
+        with self.__slot:
+            while self.__in_flight >= self.concurrency:
+                self.__slot.wait()
+            self.__in_flight += 1
+
+    def __leave_slot(self):
+        with self.__slot:
+            self.__in_flight -= 1
+            self.__slot.notify_all()
+
+    def __succeeded(self):
+        with self.__slot:
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+            self.__streak += 1
+            if self.__streak >= self.success_window:
+                self.__streak = 0
+                self.concurrency = min(self.max_concurrency, \
+                    self.concurrency + 1)
+                self.__slot.notify_all()
+
+    def __overloaded(self):
+        with self.__slot:
+            self.__streak = 0
+            now = self.__clock()
+            if self.__last_cut is not None and \
+                now - self.__last_cut < self.cooldown:
+                return
+            self.__last_cut = now
+            self.concurrency = max(1, self.concurrency // 2)
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def __delay(self, attempt, retry_after = None):
+        if retry_after is not None:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        import random
+        return random.uniform(0, min(self.max_backoff, \
+            self.backoff * 2 ** attempt))
+
+    def call(self, request):
+        """
+        Run request() under the rate limit, retrying throttled attempts.
+        request must return an object with status and headers (a transport
+        Response). The last response or exception is passed on once the
+        retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            self.__take_token()
+            self.__enter_slot()
+            try:
+                resp = request()
+            except (TimeoutError, ConnectionError):
+                self.__leave_slot()
+                self.__overloaded()
+                if attempt >= self.max_retries:
+                    raise
+                self.__sleep(self.__delay(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                self.__leave_slot()
+                raise
+            self.__leave_slot()
+            if resp.status not in RETRY_STATUSES:
+                self.__succeeded()
+                return resp
+            if resp.status in OVERLOAD_STATUSES:
+                self.__overloaded()
+            if attempt >= self.max_retries:
+                return resp
+            self.__sleep(self.__delay(attempt, \
+                resp.headers.get("Retry-After")))
+            attempt += 1
+
+    @property
+    def in_flight(self):
+        return self.__in_flight
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @rate.setter
+    def rate(self, value):
+        if not isinstance(value, (int, float)):
+            raise TypeError("rate must be of type float")
+        if value <= 0:
+            raise ValueError("rate must be positive")
+        self._rate = float(value)
+
+    @property
+    def burst(self):
+        return self._burst
+
+    @burst.setter
+    def burst(self, value):
+        if not isinstance(value, int):
+            raise TypeError("burst must be of type int")
+        if value < 1:
+            raise ValueError("burst must be at least 1")
+        self._burst = value
+
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    @concurrency.setter
+    def concurrency(self, value):
+        if not isinstance(value, int):
+            raise TypeError("concurrency must be of type int")
+        if value < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._concurrency = value
+
+    @property
+    def max_retries(self):
+        return self._max_retries
+
+    @max_retries.setter
+    def max_retries(self, value):
+        if not isinstance(value, int):
+            raise TypeError("max_retries must be of type int")
+        if value < 0:
+            raise ValueError("max_retries must not be negative")
+        self._max_retries = value
@@ -0,0 +1,159 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Interval index over time-on-ice shifts. Requires numpy."""
+
+import numpy as np
+from nhlscrappo.records import to_seconds
+
+PERIOD_LENGTH = 1200
+"""Length of a period in seconds; game time is measured across periods"""
+
+def game_seconds(period, elapsed):
+    """Seconds since opening faceoff for elapsed seconds into period"""
+    return (np.asarray(period) - 1) * PERIOD_LENGTH + np.asarray(elapsed)
+
+class ShiftIndex(object):
+    """
+    Answer "who was on the ice" queries for one game from the loaded home and
+    away TOIParser reports.
+
+    Shift endpoints are split into elementary segments over which the set of
+    players on the ice does not change, and the players on the ice during
+    each segment are stored once. A query is then a binary search over the
+    sorted endpoints. A shift covers [start, end) by default; with
+    side="right" it covers (start, end], which is the usual choice for goals
+    and other events that end a shift.
+    """
+
+    HOME = 0
+    AWAY = 1
+
+    def __init__(self, home, away):
+        names, jerseys = [], []
+        start, end, player, team = [], [], [], []
+        for code, toi in ((self.HOME, home), (self.AWAY, away)):
+            for name, periods in toi.players.items():
+                names.append(name)
+                number = toi.numbers.get(name, "")
+                jerseys.append(int(number) if number.isdigit() else -1)
+                for period, shifts in periods.items():
+                    period = 4 if period == "OT" else int(period)
+                    base = (period - 1) * PERIOD_LENGTH
+                    for shift in shifts:
+                        start.append(base + to_seconds(shift[1]))
+                        end.append(base + to_seconds(shift[2]))
+                        player.append(len(names) - 1)
+                        team.append(code)
+
+        order = np.argsort(start, kind = "stable")
+        self.names = np.array(names, dtype = object)
+        """Player names, indexed by the codes in player"""
+        self.jerseys = np.array(jerseys, dtype = np.int16)
+        """Player jersey numbers (-1 if unknown), indexed like names"""
+        self.start = np.array(start, dtype = np.int32)[order]
+        """Shift start in game seconds, sorted"""
+        self.end = np.array(end, dtype = np.int32)[order]
+        """Shift end in game seconds, in the same order as start"""
+        self.player = np.array(player, dtype = np.int32)[order]
+        self.team = np.array(team, dtype = np.int8)[order]
+
+        # Sweep the sorted endpoints, recording the shifts that cover each
+        # open segment between consecutive endpoints
+        self.bounds = np.unique(np.concatenate((self.start, self.end)))
+        starting = np.searchsorted(self.bounds, self.start)
+        ending = np.searchsorted(self.bounds, self.end)
+        members, offsets = [], [0]
+        active = set()
+        by_start, by_end = {}, {}
+        for i, (s, e) in enumerate(zip(starting, ending)):
+            # A zero-length shift covers no segment
+            if s == e:
+                continue
+            by_start.setdefault(s, []).append(i)
+            by_end.setdefault(e, []).append(i)
+        for seg in range(max(len(self.bounds) - 1, 0)):
+            active.difference_update(by_end.get(seg, ()))
+            active.update(by_start.get(seg, ()))
+            members.extend(sorted(active))
+            offsets.append(len(members))
+        self.members = np.array(members, dtype = np.int32)
+        self.offsets = np.array(offsets, dtype = np.int32)
+
+    def segments(self, period, elapsed, side = "left"):
+        """
+        Vectorized lookup of the segment covering each (period, elapsed)
+        pair. Returns -1 where no shift is in progress.
+        """
+        t = game_seconds(period, elapsed)
+        seg = np.searchsorted(self.bounds, t, side = \
+            "right" if side == "left" else "left") - 1
+        return np.where((seg >= 0) & (seg < len(self.bounds) - 1), seg, -1)
+
+    def shifts_at(self, seg):
+        """Indices of the shifts covering segment seg"""
+        if seg < 0:
+            return self.members[:0]
+        return self.members[self.offsets[seg]:self.offsets[seg + 1]]
+
+    def __names(self, shifts):
+        shifts = np.asarray(shifts)
+        home = shifts[self.team[shifts] == self.HOME]
+        away = shifts[self.team[shifts] == self.AWAY]
+        return {"home": list(self.names[self.player[home]]), \
+            "away": list(self.names[self.player[away]])}
+
+    def on_ice(self, period, elapsed, side = "left"):
+        """Players on the ice at elapsed seconds into period"""
+        seg = int(self.segments(period, elapsed, side))
+        return self.__names(self.shifts_at(seg))
+
+    def on_ice_many(self, periods, elapsed, side = "left"):
+        """on_ice for many timestamps at once"""
+        return [self.__names(self.shifts_at(seg)) for seg \
+            in self.segments(periods, elapsed, side)]
+
+    def on_ice_between(self, period, start, end):
+        """Players on the ice at any time between start and end of period"""
+        first, last = self.segments([period, period], [start, end])
+        if first < 0 and last < 0:
+            return self.__names([])
+        first = max(first, 0)
+        last = last if last >= 0 else len(self.bounds) - 2
+        shifts = np.unique(self.members[self.offsets[first]: \
+            self.offsets[last + 1]])
+        # A player may have had several shifts in the range
+        keep = np.unique(self.player[shifts], return_index = True)[1]
+        return self.__names(shifts[np.sort(keep)])
+
+    def counts(self, periods, elapsed, side = "left"):
+        """
+        Number of players on the ice for each timestamp, as an array of
+        [home, away] rows
+        """
+        seg = self.segments(periods, elapsed, side)
+        # Per-segment counts, then a single gather for all timestamps
+        seg_team = self.team[self.members]
+        owner = np.repeat(np.arange(len(self.offsets) - 1), \
+            np.diff(self.offsets))
+        # The extra final row stays zero and is what seg == -1 selects
+        table = np.zeros((len(self.offsets), 2), dtype = np.int32)
+        np.add.at(table, (owner, seg_team), 1)
+        return table[seg]
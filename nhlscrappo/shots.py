@@ -0,0 +1,129 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Dense numeric shot summaries. Requires numpy."""
+
+import numpy as np
+
+STRENGTHS = ("EV", "PP", "SH", "TOT")
+"""Strength columns of every shot array"""
+
+EV, PP, SH, TOT = range(len(STRENGTHS))
+
+HOME = 0
+AWAY = 1
+
+def _count(value):
+    """Parse a shot summary cell, 0 for blank cells"""
+    value = value.replace(u"\xa0", u"").strip()
+    return int(value) if value.isdigit() else 0
+
+class TeamShots(object):
+    """
+    Shot counts of one team as a players x periods x strengths int32 array.
+    Period p (4 for overtime) is index p - 1 and the strengths are ordered
+    as STRENGTHS.
+    """
+
+    def __init__(self, names, counts):
+        self.names = list(names)
+        """Player names (or registry IDs), indexed like counts"""
+        self.counts = counts
+        self.__rows = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_dict(cls, players, periods = None):
+        """
+        Build from one side of ShotParser.shots, with room for at least
+        periods periods
+        """
+        last = max([p for stats in players.values() for p in stats] or [0])
+        periods = max(periods or 0, last)
+        counts = np.zeros((len(players), periods, len(STRENGTHS)), \
+            dtype = np.int32)
+        for i, stats in enumerate(players.values()):
+            for period, s in stats.items():
+                counts[i, period - 1] = [_count(s[k]) for k in STRENGTHS]
+        return cls(players.keys(), counts)
+
+    @property
+    def periods(self):
+        return self.counts.shape[1]
+
+    def player(self, name):
+        """periods x strengths counts of player name"""
+        return self.counts[self.__rows[name]]
+
+    def by_player(self):
+        """Game totals of every player, players x strengths"""
+        return self.counts.sum(axis = 1)
+
+    def by_period(self):
+        """Team totals of every period, periods x strengths"""
+        return self.counts.sum(axis = 0)
+
+    def by_strength(self):
+        """Team totals of the game, one per strength"""
+        return self.counts.sum(axis = (0, 1))
+
+    def items(self):
+        """(name, {period: {strength: count}}) pairs, like ShotParser.shots"""
+        for name, counts in zip(self.names, self.counts):
+            yield name, {p + 1: dict(zip(STRENGTHS, row.tolist())) \
+                for p, row in enumerate(counts)}
+
+    def __len__(self):
+        return len(self.names)
+
+def from_shots(shots):
+    """Convert ShotParser.shots into TeamShots sharing one period axis"""
+    periods = max([p for players in shots.values() \
+        for stats in players.values() for p in stats] or [3])
+    return {side: TeamShots.from_dict(players, periods) \
+        for side, players in shots.items()}
+
+def stack(games, periods = None):
+    """
+    Team totals of many games as one games x 2 x periods x strengths array,
+    HOME and AWAY along the second axis, from numeric ShotParser.shots (or
+    their ReportResults). Games without overtime are zero past period 3.
+    """
+    games = [g.shots if hasattr(g, "shots") else g for g in games]
+    periods = max([periods or 3] + [g["home"].periods for g in games])
+    totals = np.zeros((len(games), 2, periods, len(STRENGTHS)), \
+        dtype = np.int32)
+    for i, game in enumerate(games):
+        for code, side in ((HOME, "home"), (AWAY, "away")):
+            by_period = game[side].by_period()
+            totals[i, code, :len(by_period)] = by_period
+    return totals
+
+def share(totals, strength = TOT, by_period = False):
+    """
+    Home share of the shots at strength in each game of stacked totals, or
+    of each period with by_period. Games without shots give NaN.
+    """
+    shots = totals[..., strength]
+    if not by_period:
+        shots = shots.sum(axis = -1)
+    home = shots[:, HOME].astype(np.float64)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return home / (home + shots[:, AWAY])
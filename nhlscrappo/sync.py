@@ -0,0 +1,138 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Incremental synchronisation of reports against a local manifest"""
+
+import json
+import os
+import threading
+import time
+from nhlscrappo.bulk import BulkFetcher
+
+class Manifest(object):
+    """
+    Record of every report already ingested, stored as JSON at path. Each
+    (season, game_type, game_num, report_type) maps to the time it was
+    fetched, the ETag and Last-Modified validators sent with it and the
+    SHA-1 of its content.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        if os.path.exists(path):
+            with open(path, "r") as handle:
+                self.__entries = json.load(handle)
+
+    def __key(self, report):
+        return "%i/%i/%i/%s" % (report.season, report.game_type.value, \
+            report.game_num, report.report_type.value)
+
+    def get(self, report):
+        """Return the entry recorded for report, or None"""
+        with self.__lock:
+            return self.__entries.get(self.__key(report))
+
+    def update(self, report, etag, last_modified, digest):
+        with self.__lock:
+            self.__entries[self.__key(report)] = {"fetched": time.time(), \
+                "etag": etag, "last_modified": last_modified, \
+                "sha1": digest}
+
+    def save(self):
+        """Atomically write the manifest back to path"""
+        import tempfile
+        with self.__lock:
+            data = json.dumps(self.__entries, sort_keys = True)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir = directory)
+        with os.fdopen(fd, "w") as handle:
+            handle.write(data)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.__entries)
+
+class SyncFetcher(BulkFetcher):
+    """
+    BulkFetcher that only yields new or changed reports. Every report is
+    requested with the validators recorded in the manifest; a 304, or a body
+    whose hash matches the recorded one, is left out of the results without
+    being parsed. A new or changed report is recorded in the manifest only
+    once it has been parsed and its result consumed, and the manifest is
+    saved when the run finishes.
+    """
+
+    def __init__(self, manifest, *args, **kwargs):
+        super(SyncFetcher, self).__init__(*args, **kwargs)
+        self.manifest = manifest
+        self.__lock = threading.Lock()
+        self.__staged = {}
+
+    def __stage(self, report, *entry):
+        key = (report.season, report.game_type, report.game_num, \
+            report.report_type)
+        with self.__lock:
+            self.__staged[key] = (report,) + entry
+
+    def __unstage(self, result):
+        with self.__lock:
+            return self.__staged.pop(result[:4], None)
+
+    def _load(self, report):
+        import hashlib
+        entry = self.manifest.get(report) or {}
+        resp = report.fetch(entry.get("etag"), entry.get("last_modified"))
+        etag = resp.headers.get("ETag", entry.get("etag"))
+        last_modified = resp.headers.get("Last-Modified", \
+            entry.get("last_modified"))
+        if resp.status == 304:
+            self.manifest.update(report, etag, last_modified, \
+                entry.get("sha1"))
+            return None
+        digest = hashlib.sha1(resp.body).hexdigest()
+        if digest == entry.get("sha1"):
+            self.manifest.update(report, etag, last_modified, digest)
+            return None
+        # Recorded by fetch() once the result has been consumed
+        self.__stage(report, etag, last_modified, digest)
+        report.parse(resp.body)
+        return self._finish(report)
+
+    def fetch(self):
+        try:
+            for result in super(SyncFetcher, self).fetch():
+                staged = self.__unstage(result)
+                yield result
+                if staged is not None and result.error is None:
+                    self.manifest.update(*staged)
+        finally:
+            self.manifest.save()
+
+    @property
+    def manifest(self):
+        return self._manifest
+
+    @manifest.setter
+    def manifest(self, value):
+        if not isinstance(value, Manifest):
+            raise TypeError("manifest must be of type Manifest")
+        self._manifest = value
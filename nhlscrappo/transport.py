@@ -0,0 +1,182 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""HTTP transport with per-host keep-alive connections"""
+
+import threading
+import zlib
+from collections import namedtuple
+
+Response = namedtuple("Response", ["url", "status", "reason", "headers", \
+    "body", "wire_bytes"], defaults = (None,))
+"""
+A completed request. url is the final URL after any redirects and body is
+already decoded from gzip/deflate. wire_bytes counts the body bytes as
+received, before decoding and over every redirect hop.
+"""
+
+REDIRECTS = (301, 302, 303, 307, 308)
+
+class HTTPTransport(object):
+    """
+    Issue GET requests over pooled HTTP/1.1 connections. Up to max_idle idle
+    connections are kept per host and reused by later requests. Redirects
+    are followed, up to max_redirects hops, over the pool of their target.
+    """
+
+    def __init__(self, timeout = 30.0, max_idle = 8, max_redirects = 10):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_redirects = max_redirects
+        self.__pool = {}
+        self.__lock = threading.Lock()
+
+    def __acquire(self, scheme, netloc, timeout):
+        with self.__lock:
+            idle = self.__pool.get((scheme, netloc))
+            if idle:
+                conn = idle.pop()
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self.__connect(scheme, netloc, timeout), False
+
+    def __connect(self, scheme, netloc, timeout):
+        from http.client import HTTPConnection, HTTPSConnection
+        cls = HTTPSConnection if scheme == "https" else HTTPConnection
+        return cls(netloc, timeout = timeout)
+
+    def __release(self, scheme, netloc, conn):
+        with self.__lock:
+            idle = self.__pool.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def __decode(self, body, encoding):
+        encoding = (encoding or "").strip().lower()
+        if encoding in ("gzip", "x-gzip"):
+            import gzip
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            # Servers disagree on whether deflate carries a zlib header
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+        return body
+
+    def get(self, url, headers = None, timeout = None):
+        """
+        Fetch url and return a Response, whatever its status code. A
+        redirect still pending after max_redirects hops is returned as is.
+        """
+        from urllib.parse import urljoin
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+        timeout = self.timeout if timeout is None else timeout
+        wire_bytes = 0
+        for _ in range(self.max_redirects + 1):
+            resp = self.__get(url, headers, timeout)
+            wire_bytes += resp.wire_bytes
+            location = resp.headers.get("Location")
+            if resp.status not in REDIRECTS or not location:
+                break
+            url = urljoin(url, location)
+        return resp._replace(wire_bytes = wire_bytes)
+
+    def __get(self, url, headers, timeout):
+        from http.client import HTTPException
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        conn, reused = self.__acquire(parts.scheme, parts.netloc, timeout)
+        while True:
+            try:
+                conn.request("GET", path, headers = headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (HTTPException, ConnectionError):
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; start
+                # over on a fresh one
+                conn, reused = self.__connect(parts.scheme, parts.netloc, \
+                    timeout), False
+            except Exception:
+                conn.close()
+                raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self.__release(parts.scheme, parts.netloc, conn)
+        wire_bytes = len(body)
+        body = self.__decode(body, resp.getheader("Content-Encoding"))
+        return Response(url, resp.status, resp.reason, resp.headers, body, \
+            wire_bytes)
+
+    def close(self):
+        """Close every idle connection"""
+        with self.__lock:
+            for idle in self.__pool.values():
+                for conn in idle:
+                    conn.close()
+            self.__pool.clear()
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        if not isinstance(value, (int, float)):
+            raise TypeError("timeout must be of type int or float")
+        self._timeout = value
+
+    @property
+    def max_redirects(self):
+        return self._max_redirects
+
+    @max_redirects.setter
+    def max_redirects(self, value):
+        if not isinstance(value, int):
+            raise TypeError("max_redirects must be of type int")
+        if value < 0:
+            raise ValueError("max_redirects must not be negative")
+        self._max_redirects = value
+
+    @property
+    def max_idle(self):
+        return self._max_idle
+
+    @max_idle.setter
+    def max_idle(self, value):
+        if not isinstance(value, int):
+            raise TypeError("max_idle must be of type int")
+        self._max_idle = value
+
+DEFAULT_TRANSPORT = HTTPTransport()
+"""Transport shared by every ReportFetcher that isn't given its own"""
@@ -1,6 +1,5 @@
 from nhlscrappo import __version__
-from distutils.core import setup
-from setuptools import find_packages
+from setuptools import setup, find_packages
 
 def _read(file):
     return open(file, 'rb').read()
@@ -16,5 +15,12 @@ setup(name="nhlscrappo",
       zip_safe=False,
       include_package_data=True,
       packages=find_packages(),
-      install_requires=['lxml', 'beautifulsoup4']
+      install_requires=['lxml', 'beautifulsoup4'],
+      extras_require={
+          'export': ['numpy'],
+          'parquet': ['numpy', 'pyarrow']
+      },
+      entry_points={
+          'console_scripts': ['nhlscrappo=nhlscrappo.cli:main']
+      }
 )
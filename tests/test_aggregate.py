@@ -0,0 +1,120 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for incremental season aggregation against a full recomputation"""
+
+import random
+import unittest
+import numpy as np
+from nhlscrappo import GameType
+from nhlscrappo.aggregate import STATS, SeasonAggregate, event_stats
+
+NAMES = ["PLAYER %i" % i for i in range(12)]
+
+class _Report(object):
+    """Stand-in for the ReportResult of an EventParser"""
+
+    def __init__(self, game_num, events):
+        self.season = 2018
+        self.game_type = GameType.Regular
+        self.game_num = game_num
+        self.events = events
+
+def _events(rand):
+    # Both sides draw from one pool, so namesakes face each other
+    events = {}
+    for side in ("away", "home"):
+        players = rand.sample(NAMES, rand.randint(3, 8))
+        events[side] = {player: [str(rand.randint(-1, 3)) \
+            if rand.random() < .7 else u"\xa0" for _ in STATS] \
+            for player in players}
+    return events
+
+class SeasonAggregateTest(unittest.TestCase):
+
+    def test_brute_force(self):
+        rand = random.Random(1)
+        last = 4
+        aggregate = SeasonAggregate(last = last)
+        games = []
+        for num in range(60):
+            teams = {"home": "HOME %i" % (num % 3), \
+                "away": "AWAY %i" % (num % 2)}
+            games.append([_Report(num, _events(rand)), teams])
+            aggregate.add(*games[-1])
+            if num > 3 and rand.random() < .3:
+                # Correct an earlier game, possibly one still in a window
+                game = games[rand.randint(max(0, num - 8), num)]
+                game[0] = _Report(game[0].game_num, _events(rand))
+                aggregate.add(*game)
+        self.assertEqual(len(aggregate), len(games))
+
+        history, team_totals, team_games = {}, {}, {}
+        for report, teams in games:
+            for side, players in report.events.items():
+                team = teams[side]
+                team_games[team] = team_games.get(team, 0) + 1
+                for player, values in players.items():
+                    stats = event_stats(values)
+                    history.setdefault((player, team), []).append(stats)
+                    team_totals[team] = team_totals.get(team, 0) + stats
+
+        keys, season = aggregate.table()
+        recent = aggregate.table("recent")[1]
+        # Rows corrected out of every game they had stay behind, empty
+        self.assertEqual({key for key in keys if aggregate.games(*key)}, \
+            set(history))
+        for row, (player, team) in enumerate(keys):
+            lines = history.get((player, team), [])
+            zero = np.zeros(len(STATS), dtype = np.int32)
+            self.assertTrue(np.array_equal(season[row], sum(lines, zero)))
+            self.assertTrue(np.array_equal(recent[row], \
+                sum(lines[-last:], zero)))
+            self.assertEqual(aggregate.games(player, team), len(lines))
+        for team, totals in team_totals.items():
+            self.assertTrue(np.array_equal(aggregate.team(team), totals))
+            self.assertEqual(aggregate.team_games(team), team_games[team])
+
+    def test_namesakes(self):
+        aggregate = SeasonAggregate()
+        aggregate.add(_Report(1, {"home": {"SMITH": ["1"]}, \
+            "away": {"SMITH": ["0", "2"]}}), {"home": "H", "away": "A"})
+        self.assertEqual(aggregate.season("SMITH", "H")[0], 1)
+        self.assertEqual(aggregate.season("SMITH", "A")[1], 2)
+        self.assertEqual(aggregate.games("SMITH", "A"), 1)
+        self.assertRaises(ValueError, aggregate.season, "SMITH")
+        self.assertRaises(KeyError, aggregate.season, "JONES")
+
+    def test_team_of(self):
+        aggregate = SeasonAggregate(last = 2)
+        aggregate.add(_Report(1, {"home": {"SMITH": ["1"]}, "away": {}}), \
+            {"home": "H", "away": "A"})
+        aggregate.add(_Report(2, {"home": {}, "away": {"SMITH": ["1"]}}), \
+            {"home": "H", "away": "B"})
+        self.assertEqual(aggregate.team_of("SMITH"), "B")
+        # Correcting the first game keeps the latest team
+        aggregate.add(_Report(1, {"home": {"SMITH": ["2"]}, "away": {}}), \
+            {"home": "H", "away": "A"})
+        self.assertEqual(aggregate.team_of("SMITH"), "B")
+        self.assertEqual(aggregate.recent("SMITH", "H")[0], 2)
+
+if __name__ == "__main__":
+    unittest.main()
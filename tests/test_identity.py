@@ -0,0 +1,85 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for the identities a shared registry gives players across reports"""
+
+import os
+import unittest
+from nhlscrappo import GameType
+from nhlscrappo.identity import Registry
+from nhlscrappo.parsers import EventParser, HomeTOIParser, RosterParser
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname( \
+    os.path.abspath(__file__))), "benchmarks", "corpus")
+
+def _load(cls, name, registry, renames = ()):
+    """Parse a corpus report after renaming players in it"""
+    with open(os.path.join(CORPUS, name), "rb") as handle:
+        raw = handle.read()
+    for old, new in renames:
+        raw = raw.replace(old, new)
+    parser = cls(2018, 1, GameType.Regular, registry = registry)
+    parser.make_document(local = raw)
+    parser.load_all()
+    return parser
+
+class RegistryTest(unittest.TestCase):
+
+    def test_namesakes(self):
+        # A home player renamed after an away player of the same game
+        registry = Registry()
+        roster = _load(RosterParser, "RO020001.HTM", registry, \
+            [(b"AUSTON MATTHEWS", b"PATRICE BERGERON")])
+        events = _load(EventParser, "ES020001.HTM", registry, \
+            [(b"MATTHEWS, AUSTON", b"BERGERON, PATRICE")])
+        shifts = _load(HomeTOIParser, "TH020001.HTM", registry, \
+            [(b"MATTHEWS, AUSTON", b"BERGERON, PATRICE")])
+
+        home = registry.id("PATRICE BERGERON", "TORONTO MAPLE LEAFS")
+        away = registry.id("PATRICE BERGERON", "BOSTON BRUINS")
+        self.assertNotEqual(home, away)
+        self.assertEqual(registry.name(home), registry.name(away))
+        self.assertEqual(registry.team(home), "TORONTO MAPLE LEAFS")
+
+        self.assertIn(home, roster.rosters["home"])
+        self.assertIn(away, roster.rosters["away"])
+        self.assertIn(home, events.events["home"])
+        self.assertIn(away, events.events["away"])
+        self.assertIn(home, shifts.players)
+        self.assertNotIn(away, shifts.players)
+        number = roster.rosters["home"][home]["num"]
+        self.assertEqual(registry.jersey("TORONTO MAPLE LEAFS", number), home)
+
+    def test_shared(self):
+        # Every report of a game names the same people
+        registry = Registry()
+        roster = _load(RosterParser, "RO020001.HTM", registry)
+        people = len(registry)
+        events = _load(EventParser, "ES020001.HTM", registry)
+        self.assertEqual(len(registry), people)
+        for side in ("home", "away"):
+            self.assertTrue(set(events.events[side]) <= \
+                set(roster.rosters[side]) | set(roster.scratches[side]))
+        self.assertIn(("BRAD MARCHAND", "BOSTON BRUINS"), registry)
+        self.assertNotIn(("BRAD MARCHAND", "TORONTO MAPLE LEAFS"), registry)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for joining plays with shifts over the benchmark corpus"""
+
+import os
+import unittest
+from nhlscrappo import GameType
+from nhlscrappo.join import PlayShiftJoin
+from nhlscrappo.parsers import AwayTOIParser, HomeTOIParser, PlayParser
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname( \
+    os.path.abspath(__file__))), "benchmarks", "corpus")
+
+def _load(cls, code, game, **kwargs):
+    parser = cls(2018, int(game[2:]), GameType(int(game[1])), **kwargs)
+    parser.make_document(local = os.path.join(CORPUS, code + game + ".HTM"))
+    parser.load_all()
+    return parser
+
+class PlayShiftJoinTest(unittest.TestCase):
+
+    def test_corpus(self):
+        # The fixture play-by-play and shift reports describe the same games
+        for game in ("020001", "030111"):
+            join = PlayShiftJoin(_load(PlayParser, "PL", game).plays, \
+                _load(HomeTOIParser, "TH", game), \
+                _load(AwayTOIParser, "TV", game))
+            self.assertTrue(join.plays)
+            self.assertFalse(join.home_mismatch.any(), game)
+            self.assertFalse(join.away_mismatch.any(), game)
+            counts = join.index.counts([p.period for p in join.plays], \
+                [p.elapsed for p in join.plays])
+            self.assertLessEqual(counts.max(), 6)
+            for i, play in enumerate(join.plays):
+                if play.home_on_ice:
+                    self.assertEqual(len(join.names(i)["home"]), \
+                        len(play.home_on_ice))
+
+if __name__ == "__main__":
+    unittest.main()
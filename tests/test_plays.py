@@ -0,0 +1,79 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests that every play-by-play path extracts the same plays"""
+
+import glob
+import mmap
+import os
+import unittest
+from nhlscrappo import GameType
+from nhlscrappo.parsers import PlayParser
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname( \
+    os.path.abspath(__file__))), "benchmarks", "corpus")
+
+def _parser(path, **kwargs):
+    name = os.path.basename(path)
+    return PlayParser(2018, int(name[4:8]), GameType(int(name[3])), **kwargs)
+
+def _plays(local, backend, path = None, **kwargs):
+    parser = _parser(path or local, backend = backend, **kwargs)
+    parser.make_document(local = local)
+    parser.load_all()
+    return parser.plays
+
+class BackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reports = sorted(glob.glob(os.path.join(CORPUS, "PL*.HTM")))
+        self.assertTrue(self.reports)
+
+    def test_backends(self):
+        for path in self.reports:
+            soup = _plays(path, "soup")
+            self.assertTrue(soup, path)
+            self.assertEqual(_plays(path, "lxml"), soup, path)
+            self.assertEqual(list(_parser(path).iter_plays(path)), soup, path)
+
+    def test_filtered(self):
+        for path in self.reports:
+            soup = _plays(path, "soup", events = ("GOAL", "SHOT"))
+            self.assertTrue(all(play[4] in ("GOAL", "SHOT") for play in soup))
+            self.assertEqual(_plays(path, "lxml", events = ("GOAL", \
+                "SHOT")), soup, path)
+            self.assertEqual(list(_parser(path, events = ("GOAL", \
+                "SHOT")).iter_plays(path)), soup, path)
+
+    def test_mapped(self):
+        # A caller's mmap is used whole, whatever its position, every time
+        path = self.reports[0]
+        soup = _plays(path, "soup")
+        with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, \
+            access = mmap.ACCESS_READ) as view:
+            for backend in ("soup", "lxml", "soup", "lxml"):
+                self.assertEqual(_plays(view, backend, path), soup, \
+                    backend)
+            self.assertEqual(list(_parser(path).iter_plays(view)), soup)
+            self.assertEqual(list(_parser(path).iter_plays(view)), soup)
+
+if __name__ == "__main__":
+    unittest.main()
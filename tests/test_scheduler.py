@@ -0,0 +1,147 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for the request scheduler against a failure-injecting server"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from nhlscrappo.scheduler import RequestScheduler
+from nhlscrappo.transport import HTTPTransport
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answer with the next scripted (status, headers) of the path, then 200"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        script = self.server.script.get(self.path, [])
+        status, headers = script.pop(0) if script else (200, {})
+        self.server.hits.append((self.path, status))
+        body = b"ok" if status == 200 else b"failed"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class _Clock(object):
+    """Fake monotonic clock that only moves when slept on"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class RequestSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.script, self.server.hits = {}, []
+        thread = threading.Thread(target = self.server.serve_forever, \
+            kwargs = {"poll_interval": 0.05})
+        thread.daemon = True
+        thread.start()
+        self.root = "http://127.0.0.1:%i" % self.server.server_port
+        self.transport = HTTPTransport(timeout = 5.0)
+        self.clock = _Clock()
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def scheduler(self, **kwargs):
+        return RequestScheduler(clock = self.clock, sleep = self.clock.sleep, \
+            **kwargs)
+
+    def get(self, scheduler, path):
+        return scheduler.call(lambda: self.transport.get(self.root + path))
+
+    def test_retry_after(self):
+        self.server.script["/busy"] = [(429, {"Retry-After": "7"})]
+        scheduler = self.scheduler(concurrency = 8)
+        resp = self.get(scheduler, "/busy")
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(self.server.hits, [("/busy", 429), ("/busy", 200)])
+        self.assertIn(7.0, self.clock.sleeps)
+        # 429 is an overload: concurrency and rate are halved
+        self.assertEqual(scheduler.concurrency, 4)
+        self.assertLess(scheduler.rate, 5.0)
+
+    def test_retries_exhausted(self):
+        self.server.script["/broken"] = [(500, {})] * 10
+        scheduler = self.scheduler(max_retries = 3, backoff = 0.5, \
+            concurrency = 8)
+        resp = self.get(scheduler, "/broken")
+        self.assertEqual(resp.status, 500)
+        self.assertEqual(len(self.server.hits), 4)
+        # Full jitter stays under the exponential bound of each attempt
+        backoffs = [s for s in self.clock.sleeps if s > 0]
+        for attempt, seconds in enumerate(backoffs):
+            self.assertLessEqual(seconds, 0.5 * 2 ** attempt)
+        # A plain 5xx is retried but is not an overload
+        self.assertEqual(scheduler.concurrency, 8)
+
+    def test_concurrency_recovers(self):
+        self.server.script["/overload"] = [(503, {"Retry-After": "0"}), \
+            (503, {"Retry-After": "0"})]
+        scheduler = self.scheduler(concurrency = 8, success_window = 3, \
+            cooldown = 1.0, rate = 100.0, burst = 100)
+        self.assertEqual(self.get(scheduler, "/overload").status, 200)
+        # Both 503s fell within one cooldown and count as one overload
+        self.assertEqual(scheduler.concurrency, 4)
+
+        self.server.script["/overload"] = [(503, {"Retry-After": "0"})]
+        self.clock.now += 5.0
+        self.get(scheduler, "/overload")
+        self.assertEqual(scheduler.concurrency, 2)
+
+        # One more request in flight per success_window successes
+        for _ in range(6):
+            self.get(scheduler, "/fine")
+        self.assertEqual(scheduler.concurrency, 4)
+        self.assertEqual(scheduler.in_flight, 0)
+
+    def test_settings(self):
+        self.assertRaises(TypeError, RequestScheduler, rate = "5")
+        self.assertRaises(ValueError, RequestScheduler, rate = 0)
+        self.assertRaises(TypeError, RequestScheduler, burst = 2.5)
+        self.assertRaises(ValueError, RequestScheduler, burst = 0)
+        self.assertRaises(TypeError, RequestScheduler, concurrency = None)
+        self.assertRaises(ValueError, RequestScheduler, concurrency = 0)
+        self.assertRaises(TypeError, RequestScheduler, max_retries = 1.0)
+        self.assertRaises(ValueError, RequestScheduler, max_retries = -1)
+        scheduler = RequestScheduler(rate = 2)
+        self.assertEqual(scheduler.rate, 2.0)
+        self.assertIsInstance(scheduler.rate, float)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for the time-on-ice interval index"""
+
+import unittest
+from nhlscrappo.shifts import ShiftIndex
+
+class _TOI(object):
+    """Stand-in for a loaded TOIParser"""
+
+    def __init__(self, players, numbers = None):
+        self.players = players
+        self.numbers = numbers or {}
+
+class ShiftIndexTest(unittest.TestCase):
+
+    def test_on_ice(self):
+        home = _TOI({"A": {"1": [["1", "0:00", "0:45", ""]]}, \
+            "B": {"1": [["1", "0:30", "1:10", ""]]}})
+        away = _TOI({"C": {"1": [["1", "0:00", "2:00", ""]]}})
+        index = ShiftIndex(home, away)
+        self.assertEqual(index.on_ice(1, 40), {"home": ["A", "B"], \
+            "away": ["C"]})
+        self.assertEqual(index.on_ice(1, 45), {"home": ["B"], \
+            "away": ["C"]})
+        self.assertEqual(index.on_ice(1, 45, side = "right"), \
+            {"home": ["A", "B"], "away": ["C"]})
+        self.assertEqual(index.counts([1, 1], [10, 60]).tolist(), \
+            [[1, 1], [1, 1]])
+
+    def test_zero_length_shift(self):
+        # A shift that starts and ends on the same second must not leave
+        # its player on the ice for the rest of the game
+        home = _TOI({"A": {"1": [["1", "0:10", "0:10", ""]]}, \
+            "B": {"1": [["1", "0:00", "1:00", ""]]}})
+        away = _TOI({"C": {"1": [["1", "0:00", "1:00", ""]]}})
+        index = ShiftIndex(home, away)
+        self.assertEqual(index.on_ice(1, 50), {"home": ["B"], \
+            "away": ["C"]})
+        self.assertEqual(index.counts([1], [50]).tolist(), [[1, 1]])
+        self.assertEqual(index.on_ice_between(1, 20, 55)["home"], ["B"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for incremental synchronisation against a manifest"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from nhlscrappo import ReportType
+from nhlscrappo.sync import Manifest, SyncFetcher
+from nhlscrappo.transport import HTTPTransport, Response
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname( \
+    os.path.abspath(__file__))), "benchmarks", "corpus")
+
+class _StubTransport(HTTPTransport):
+    """Serve one body for every URL, honouring If-None-Match"""
+
+    def __init__(self, body):
+        super(_StubTransport, self).__init__()
+        self.body = body
+        self.requests = []
+
+    def get(self, url, headers = None, timeout = None):
+        headers = headers or {}
+        etag = '"%i"' % len(self.body)
+        self.requests.append(headers.get("If-None-Match"))
+        if headers.get("If-None-Match") == etag:
+            return Response(url, 304, "Not Modified", {"ETag": etag}, b"")
+        return Response(url, 200, "OK", {"ETag": etag}, self.body)
+
+class SyncFetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "manifest.json")
+        with open(os.path.join(CORPUS, "ES020001.HTM"), "rb") as handle:
+            self.report = handle.read()
+        self.transport = _StubTransport(self.report[:300])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_sync(self):
+        fetcher = SyncFetcher(Manifest(self.path), 2018, \
+            report_types = ReportType.Events, games = [1], \
+            results_only = True, transport = self.transport)
+        return list(fetcher)
+
+    def test_failed_parse_not_recorded(self):
+        # A truncated report fails to parse and must be fetched again
+        for _ in range(2):
+            results = self.run_sync()
+            self.assertEqual(len(results), 1)
+            self.assertIsNotNone(results[0].error)
+            self.assertEqual(len(Manifest(self.path)), 0)
+        self.assertEqual(self.transport.requests, [None, None])
+
+        self.transport.body = self.report
+        results = self.run_sync()
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0].error)
+        self.assertTrue(results[0].report.events["home"])
+        self.assertEqual(len(Manifest(self.path)), 1)
+
+        # Recorded once ingested: the next run is answered with a 304
+        self.assertEqual(self.run_sync(), [])
+        self.assertIsNotNone(self.transport.requests[-1])
+
+    def test_unconsumed_result_not_recorded(self):
+        self.transport.body = self.report
+        fetcher = SyncFetcher(Manifest(self.path), 2018, \
+            report_types = ReportType.Events, games = [1], \
+            results_only = True, transport = self.transport)
+        results = fetcher.fetch()
+        next(results)
+        results.close()
+        self.assertEqual(len(Manifest(self.path)), 0)
+
+if __name__ == "__main__":
+    unittest.main()
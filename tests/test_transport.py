@@ -0,0 +1,156 @@
+# Copyright (c) 2015-2019 Jack Morton <jhm@jemscout.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tests for the pooled HTTP transport against a local server"""
+
+import gzip
+import threading
+import unittest
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from nhlscrappo.transport import HTTPTransport
+
+BODY = b"<html><body>" + b"report " * 500 + b"</body></html>"
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def __send(self, status, body = b"", headers = ()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.client_address, self.path, \
+            self.headers.get("Accept-Encoding")))
+        path = self.path
+        if path == "/plain":
+            self.__send(200, BODY)
+        elif path == "/gzip":
+            self.__send(200, gzip.compress(BODY), \
+                [("Content-Encoding", "gzip")])
+        elif path == "/deflate":
+            self.__send(200, zlib.compress(BODY), \
+                [("Content-Encoding", "deflate")])
+        elif path == "/raw-deflate":
+            compressor = zlib.compressobj(wbits = -zlib.MAX_WBITS)
+            body = compressor.compress(BODY) + compressor.flush()
+            self.__send(200, body, [("Content-Encoding", "deflate")])
+        elif path == "/moved":
+            self.__send(301, b"moved", [("Location", "/plain")])
+        elif path == "/chain":
+            self.__send(302, headers = [("Location", "/temporary")])
+        elif path == "/temporary":
+            self.__send(307, headers = [("Location", "/moved")])
+        elif path == "/loop":
+            self.__send(301, headers = [("Location", "/loop")])
+        elif path.startswith("/to/"):
+            self.__send(308, headers = [("Location", path[4:])])
+        else:
+            self.__send(404, b"missing")
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.requests = []
+    thread = threading.Thread(target = server.serve_forever, \
+        kwargs = {"poll_interval": 0.05})
+    thread.daemon = True
+    thread.start()
+    return server
+
+class HTTPTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _serve()
+        self.other = _serve()
+        self.root = "http://127.0.0.1:%i" % self.server.server_port
+        self.transport = HTTPTransport(timeout = 5.0)
+
+    def tearDown(self):
+        self.transport.close()
+        for server in (self.server, self.other):
+            server.shutdown()
+            server.server_close()
+
+    def connections(self, server):
+        return set(address for address, _, _ in server.requests)
+
+    def test_keep_alive(self):
+        for _ in range(3):
+            resp = self.transport.get(self.root + "/plain")
+            self.assertEqual(resp.status, 200)
+            self.assertEqual(resp.body, BODY)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.connections(self.server)), 1)
+
+    def test_content_encoding(self):
+        self.assertEqual(self.transport.get(self.root + "/plain").wire_bytes, \
+            len(BODY))
+        for path in ("/gzip", "/deflate", "/raw-deflate"):
+            resp = self.transport.get(self.root + path)
+            self.assertEqual(resp.body, BODY, path)
+            # Counted as transferred, before decoding
+            self.assertLess(resp.wire_bytes, len(BODY) // 10, path)
+        for _, _, accept in self.server.requests:
+            self.assertEqual(accept, "gzip, deflate")
+
+    def test_not_found(self):
+        resp = self.transport.get(self.root + "/nothing")
+        self.assertEqual((resp.status, resp.body), (404, b"missing"))
+
+    def test_redirect(self):
+        resp = self.transport.get(self.root + "/moved")
+        self.assertEqual((resp.status, resp.body), (200, BODY))
+        self.assertEqual(resp.url, self.root + "/plain")
+        self.assertEqual(resp.wire_bytes, len(b"moved") + len(BODY))
+        # Both hops share one pooled connection
+        self.assertEqual(len(self.connections(self.server)), 1)
+
+    def test_redirect_chain(self):
+        resp = self.transport.get(self.root + "/chain")
+        self.assertEqual((resp.status, resp.body), (200, BODY))
+        self.assertEqual([path for _, path, _ in self.server.requests], \
+            ["/chain", "/temporary", "/moved", "/plain"])
+
+    def test_redirect_other_host(self):
+        target = "http://127.0.0.1:%i/plain" % self.other.server_port
+        for _ in range(2):
+            resp = self.transport.get(self.root + "/to/" + target)
+            self.assertEqual((resp.status, resp.url), (200, target))
+        # Each host keeps its own pooled connection
+        self.assertEqual(len(self.connections(self.server)), 1)
+        self.assertEqual(len(self.connections(self.other)), 1)
+        self.assertEqual(len(self.other.requests), 2)
+
+    def test_redirect_limit(self):
+        self.transport.max_redirects = 3
+        resp = self.transport.get(self.root + "/loop")
+        self.assertEqual(resp.status, 301)
+        self.assertEqual(len(self.server.requests), 4)
+
+if __name__ == "__main__":
+    unittest.main()